@@ -0,0 +1,169 @@
+"""
+The asset archive - a single file, containing all game assets (see pack_assets.py).
+
+This module has no side effects on import (it doesn't initialize pygame or open the archive),
+so pack_assets.py can use it without a display or an audio device. main.py opens the archive on launch.
+"""
+
+import io
+import mmap
+import os
+import struct
+
+# All assets packed into one file (see pack_assets.py) - loose files are used, if it does not exist (development)
+ASSET_ARCHIVE_FILE = "assets.pak"
+
+
+class AssetArchive:
+    """
+    Class for a single file, containing all game assets.
+
+    Loading many loose files is slow - especially in the PyInstaller build, which extracts every file on launch.
+    The archive starts with an index of all assets (name, offset, length, type), followed by the file contents.
+    It is opened once and memory-mapped, so opening an asset doesn't read or copy anything. Pygame reads the assets
+    through file-like views (pygame.image.load, pygame.mixer.Sound and pygame.font.Font accept file-like objects),
+    which copy the requested bytes out of the mapped file once (see ArchiveMemberFile).
+
+    Format (little endian):
+        header:  magic (6 bytes), version (uint16), number of entries (uint32)
+        entry:   name length (uint16), name (utf-8), offset (uint64), length (uint64), type (uint8)
+        data:    the file contents, at the offsets given in the index
+
+    Args:
+        path (str): Path of the archive file.
+
+    Attributes:
+        index (dict): Maps asset names to (offset, length, type).
+        data (mmap.mmap): The memory-mapped archive.
+
+    Methods:
+        open(name): Returns a file-like view of an asset.
+        open_if_exists(path): Opens the archive at path, or returns None if there is none.
+        write(path, base_path, relative_paths): Packs the given files into a new archive.
+        normalize_name(relative_path): Turns a relative path into the name used in the index.
+
+    """
+    MAGIC = b"HFPAK\0"
+    VERSION = 1
+    HEADER = struct.Struct("<6sHI")
+    ENTRY_NAME_LENGTH = struct.Struct("<H")
+    ENTRY = struct.Struct("<QQB")
+
+    TYPE_OTHER, TYPE_IMAGE, TYPE_SOUND, TYPE_FONT = range(4)
+    FILE_TYPES = {
+        ".png": TYPE_IMAGE, ".gif": TYPE_IMAGE,
+        ".wav": TYPE_SOUND, ".mp3": TYPE_SOUND, ".ogg": TYPE_SOUND,
+        ".ttf": TYPE_FONT,
+    }
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.data)
+        self.index = {}
+
+        magic, version, entry_count = self.HEADER.unpack_from(self.data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{path} is not an asset archive (version {self.VERSION})")
+
+        position = self.HEADER.size
+        for _ in range(entry_count):
+            (name_length,) = self.ENTRY_NAME_LENGTH.unpack_from(self.data, position)
+            position += self.ENTRY_NAME_LENGTH.size
+            name = bytes(self.view[position:position + name_length]).decode("utf-8")
+            position += name_length
+            self.index[name] = self.ENTRY.unpack_from(self.data, position)
+            position += self.ENTRY.size
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def open(self, name):
+        offset, length, _ = self.index[name]
+        return ArchiveMemberFile(self.view[offset:offset + length], name)
+
+    @classmethod
+    def open_if_exists(cls, path):
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    @staticmethod
+    def normalize_name(relative_path):
+        return os.path.normpath(relative_path).replace(os.sep, "/")
+
+    @classmethod
+    def write(cls, path, base_path, relative_paths):
+        names = [cls.normalize_name(relative_path) for relative_path in relative_paths]
+        sizes = [os.path.getsize(os.path.join(base_path, name)) for name in names]
+
+        # The data starts after the index
+        index_size = cls.HEADER.size + sum(
+            cls.ENTRY_NAME_LENGTH.size + len(name.encode("utf-8")) + cls.ENTRY.size for name in names
+        )
+
+        with open(path, "wb") as archive:
+            archive.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(names)))
+            offset = index_size
+            for name, size in zip(names, sizes):
+                encoded_name = name.encode("utf-8")
+                file_type = cls.FILE_TYPES.get(os.path.splitext(name)[1].lower(), cls.TYPE_OTHER)
+                archive.write(cls.ENTRY_NAME_LENGTH.pack(len(encoded_name)))
+                archive.write(encoded_name)
+                archive.write(cls.ENTRY.pack(offset, size, file_type))
+                offset += size
+
+            for name in names:
+                with open(os.path.join(base_path, name), "rb") as file:
+                    archive.write(file.read())
+
+
+class ArchiveMemberFile(io.RawIOBase):
+    """
+    Read-only file-like view of one asset in the AssetArchive.
+
+    readinto() copies straight from the memory-mapped archive into the caller's buffer.
+    read() is overridden to copy once into the returned bytes (io.RawIOBase.read() would copy into a bytearray first
+    and then into bytes). The data is still copied out of the mapping - pygame decodes from the copy.
+
+    """
+    def __init__(self, view, name):
+        super().__init__()
+        self.view = view
+        self.name = name
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        end = len(self.view) if size is None or size < 0 else min(len(self.view), self.position + size)
+        data = bytes(self.view[self.position:end])
+        self.position += len(data)
+        return data
+
+    readall = read
+
+    def readinto(self, buffer):
+        length = min(len(buffer), len(self.view) - self.position)
+        if length <= 0:
+            return 0
+        buffer[:length] = self.view[self.position:self.position + length]
+        self.position += length
+        return length
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = len(self.view) + offset
+        self.position = max(0, self.position)
+        return self.position
+
+    def tell(self):
+        return self.position
@@ -0,0 +1,107 @@
+"""
+Background benchmark - compares drawing the scrolling background through the viewport cache (ScrollingBackground)
+with drawing the road chunks and the tyre mark layer straight onto the screen every frame.
+
+The game is started with the dummy video and audio drivers and the background is scrolled like in the main game.
+Both variants are measured without tyre marks and with tyre marks spread over the whole mark layer
+(after driving on grass for a while, the marked part of the layer covers all of it).
+Every frame both rear wheels leave a mark, as when driving on grass.
+
+Usage:
+    python background_benchmark.py [--frames 600]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from main import Game
+
+WARM_UP_FRAMES = 50
+
+
+def start_game():
+    # High scores of the benchmark don't end up in the player's leaderboard
+    Game.HIGH_SCORE_DIR = tempfile.mkdtemp(prefix="highway_frenzy_background_")
+    game = Game()
+    game.asset_streamer.wait()
+    for _ in game.prefetch_main_game():
+        pass
+    game.change_to_main_game()
+    game.initialize_behaviour()
+    return game
+
+
+def draw_direct(game, bg_x):
+    # The road chunks and the marked part of the tyre mark layer (once per repetition of the layer)
+    y = game.ACTUAL_SCREEN_HEIGHT // 8
+    game.road.draw(game.screen, bg_x, y, 0, game.ACTUAL_SCREEN_WIDTH)
+    width = game.tyre_marks.surface.get_width()
+    for x in range(bg_x % width - width, game.ACTUAL_SCREEN_WIDTH, width):
+        game.tyre_marks.draw(game.screen, (x, y))
+    game.tyre_marks.take_changed_rects()
+    game.road.take_changed_segments()
+
+
+def draw_cached(game, bg_x):
+    game.background_cache.draw(game.screen, game.ACTUAL_SCREEN_HEIGHT // 8, game.road, game.tyre_marks, bg_x)
+
+
+def measure(game, draw, frames):
+    """
+    Scrolls the background for frames frames and returns the average time of draw() (milliseconds).
+    """
+    road, marks = game.road, game.tyre_marks
+    total = 0.0
+    for _ in range(frames):
+        game.bg_x -= game.BACKGROUND_SPEED
+        for index in road.update(game.bg_x, game.ACTUAL_SCREEN_WIDTH):
+            slot = index % game.ROAD_RESIDENT_CHUNKS
+            marks.clear(pygame.Rect(slot * road.chunk_width, 0, road.chunk_width, road.height))
+
+        # Both rear wheels on grass
+        x = (game.player_rect.left - game.bg_x) % marks.surface.get_width()
+        marks.add_mark(0, (x, int(0.1 * road.height)), game.TYRE_MARK_COLOR, 4)
+        marks.add_mark(1, (x, int(0.9 * road.height)), game.TYRE_MARK_COLOR, 4)
+
+        # Like draw_level(), which clears the screen before the background is drawn
+        game.screen.fill((0, 0, 0))
+        start = time.perf_counter()
+        draw(game, game.bg_x)
+        total += time.perf_counter() - start
+    return total / frames * 1000
+
+
+def benchmark(frames):
+    random.seed(0)
+    game = start_game()
+    marks = game.tyre_marks
+    print(f"Screen {game.screen.get_size()}, road height {game.road.height}, tyre mark layer {marks.surface.get_size()}")
+    print(f"{'':22}{'direct':>10}{'cached':>10}  (ms per frame)")
+
+    for spread_marks in (False, True):
+        marks.clear()
+        if spread_marks:
+            for x in range(0, marks.surface.get_width(), 50):
+                marks.add_mark("spread", (x, game.road.height // 2), game.TYRE_MARK_COLOR, 4)
+                marks.lift("spread")
+        times = []
+        for draw in (draw_direct, draw_cached):
+            measure(game, draw, WARM_UP_FRAMES)
+            times.append(measure(game, draw, frames))
+        title = "marks everywhere" if spread_marks else "no earlier marks"
+        print(f"{title:22}" + "".join(f"{value:10.3f}" for value in times))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares drawing the background through the viewport cache and directly.")
+    parser.add_argument("--frames", type=int, default=600, help="measured frames per variant")
+    arguments = parser.parse_args()
+    benchmark(arguments.frames)
@@ -52,20 +52,44 @@ Requires: Pygame library
 
 import sys
 import os
+import json
+import struct
 import random
 import time
-
+import queue
+import threading
+import zlib
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
 import pygame
 
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and for PyInstaller """
+from archive import ASSET_ARCHIVE_FILE, AssetArchive
+
+def get_base_path():
+    """ Get absolute path to the folder of the resources, works for dev and for PyInstaller """
     try:
         # PyInstaller creates a temp folder and stores path in _MEIPASS
         base_path = sys._MEIPASS
     except Exception:
         base_path = os.path.abspath(".")
 
-    return os.path.join(base_path, relative_path)
+    return base_path
+
+def resource_path(relative_path):
+    """ 
+    Get absolute path to resource, works for dev and for PyInstaller 
+
+    If the resource is packed in the asset archive, a file-like view into the archive is returned instead of a path.
+    Pygame loads images, sounds and fonts from both.
+    """
+    name = AssetArchive.normalize_name(relative_path)
+    if asset_archive is not None and name in asset_archive:
+        return asset_archive.open(name)
+
+    return os.path.join(get_base_path(), relative_path)
 
 
 # Initialize Pygame
@@ -89,12 +113,45 @@ class Game:
     # Timer font size
     TIMER_FONT_SIZE = 80
     HIGH_SCORE_FONT_SIZE = 160
+    LEADERBOARD_FONT_SIZE = 50
+    STATISTICS_FONT_SIZE = 40
+
+    # High scores of this machine - the game over screen lists the best of them
+    HIGH_SCORE_DIR = os.path.join(os.path.expanduser("~"), ".highway_frenzy")
+    HIGH_SCORE_TOP_COUNT = 10
+    HIGH_SCORE_MAX_LOG_RECORDS = 5000  # The score log is compacted, when it has more records
+    LEADERBOARD_LENGTH = 5
+
+    # Ghost of the best run on this machine - stored next to the high scores
+    GHOST_FILE = "ghost_best.bin"
+    GHOST_RECORDING_FILE = "ghost_recording.bin"
+    GHOST_ALPHA = 90
+
+    # Capturing the shown frames for QA and marketing - written on a background thread (see FrameCapture)
+    # Captures are stored next to the high scores, in this folder
+    FRAME_CAPTURE = False
+    FRAME_CAPTURE_FOLDER = "captures"
+    FRAME_CAPTURE_BUFFERS = 8  # Frames, that can wait for the writer - when all are in use, frames are skipped
+    FRAME_CAPTURE_COMPRESSION = 1  # zlib level (0 writes raw frames)
+
+    # Statistics of the last run (shown on the game over screen) are exported next to the high scores
+    RUN_STATISTICS_FILE = "last_run.json"
+    NEAR_MISS_DISTANCE = 3  # A car passing the player closer than this (percent of screen height) is a near miss
 
     # Constants to control game speed
     BACKGROUND_SPEED = 3
-    ENEMY_SPEED = 2
     CANISTER_SPEED = 6
 
+    # Traffic - every car lane (top to bottom) has its own speed distribution (see TrafficModel)
+    # (mean, spread) of the speed in pixels per frame, that the cars fall back - a higher speed is slower on the road
+    CAR_LANE_SPEEDS = [(1.5, 0.3), (1.8, 0.3), (2.2, 0.3), (2.5, 0.3)]
+    CAR_BUDGET = 64  # Maximum number of enemy cars - no new cars are spawned, when all are on the road
+    CAR_MIN_GAP = 2  # Percent of the screen width, that cars keep to the car in front
+    CAR_FOLLOWING_DISTANCE = 12  # Percent of the screen width - closer cars adapt their speed to the car in front
+    CAR_GAP_GAIN = 0.02  # Speed added per pixel, that a car is closer than the minimum gap
+    CAR_ACCELERATION = 0.02  # Maximum speed change per frame
+    CAR_BRAKING = 0.1
+
     PLAYER_ACCELERATION = 0.5
     PLAYER_SPEED_MAX = 5
     PLAYER_SPEED_MIN = -5
@@ -114,16 +171,68 @@ class Game:
     WAVE_DOWN_TIME = TRANSITION_SPEED * 2
 
     # Resources
-    transition_images = []
+    road_sources = []
     enemy_images = []
-    cut_out_tree_images = []
-
-    # Default background
-    current_background = None
-    # Background Position X
+    canopy_layers = []
+
+    # Tile size (pixels) of the tree canopy layers - only tiles with visible tree tops are kept
+    CANOPY_TILE_SIZE = 64
+    CANOPY_COVERAGE_ESTIMATE = 0.1  # Fraction of the tree images kept as canopy tiles (for the texture memory estimate)
+
+    # The road is built from chunks, each showing a segment of the background image (see ProceduralRoad)
+    ROAD_CHUNK_WIDTH = 25  # Percent of the screen width - rounded down to whole canopy tiles
+    ROAD_JOIN_TOLERANCE = 8  # Maximum color difference of the edges of two segments, that can follow each other
+    ROAD_JUMP_CHANCE = 0.5  # Chance, that the road continues with another segment at a join
+    ROAD_SEED = None  # None for a different road every launch
+
+    # Texture resolution of the asset groups: "full", "half" or "quarter" - e.g. {"trees": "half"}
+    # Groups set to None are chosen at startup, so the estimated texture memory fits TEXTURE_MEMORY_BUDGET_MB
+    QUALITY_TIERS = {"backgrounds": None, "trees": None, "sprites": None}
+    TEXTURE_MEMORY_BUDGET_MB = 192
+    # Print the chosen tiers at startup, and the resident texture memory of each group under each tier, once the gameplay resources are loaded
+    TEXTURE_MEMORY_REPORT = False
+
+    # Milliseconds per start screen frame, used to prepare gameplay resources loaded in the background
+    ASSET_STREAM_BUDGET_MS = 8
+
+    # Maximum number of particles (crash explosions, exhaust smoke) - new particles are dropped, when all are in use
+    PARTICLE_BUDGET = 600
+    EXHAUST_PARTICLES_PER_SECOND = 20
+
+    # Tyre marks, when driving over grass
+    TYRE_MARK_COLOR = (45, 35, 20, 150)
+
+    # Brightness of headlights and taillights at full night (0 to 1)
+    NIGHT_LIGHT_INTENSITY = 0.6
+
+    # Adaptive quality - quality is stepped down, when frames take too long, and back up with hysteresis (see QualityGovernor)
+    # Levels: 1 slower animations and fewer particles, 2 headlights only for the player, 3 canopy without its transparent edges
+    QUALITY_GOVERNOR = True
+    QUALITY_FRAME_BUDGET_MS = 1000 / 120
+    QUALITY_WINDOW_FRAMES = 120
+    QUALITY_DOWN_THRESHOLD = 0.9  # Fraction of the frame budget
+    QUALITY_UP_THRESHOLD = 0.6
+    QUALITY_UP_WINDOWS = 5
+    QUALITY_FIXED_LEVEL = None  # 0 (full) to 3 (low) - keeps this level instead of adapting
+
+    # Systems of a main game frame in the order they run (see create_frame_scheduler()) - can be reordered for profiling experiments
+    FRAME_SYSTEMS = [
+        "input", "spawn", "simulate", "collide", "cull",
+        "draw_background", "draw_entities", "draw_night_lights", "draw_particles", "draw_canopy", "compose_hud", "draw_hud", "present",
+    ]
+    DISABLED_FRAME_SYSTEMS = []  # e.g. ["draw_particles"] - skipped systems
+    CONCURRENT_FRAME_SYSTEMS = []  # e.g. ["compose_hud"] - run on a worker thread, concurrently with the systems before them
+    FRAME_SYSTEMS_REPORT_FRAMES = 0  # Prints the average time of each system every this many frames (0: off)
+
+    # Road, built from chunks of the background images (see ProceduralRoad)
+    road = None
+    # Background Position X - keeps decreasing, the road doesn't loop
     bg_x = 0
     # Default trees
-    current_trees = None
+    current_canopy = None
+    transition_sources = None  # Images the current background and canopy were made from (see set_transition_index())
+    bound_format_key = None  # Display format the gameplay surfaces were fetched for (see bind_gameplay_assets())
+    road_color_key = None  # Color key of the background images (transparent pixels), restored on the baked road chunks
 
     player_rect = None
 
@@ -139,19 +248,62 @@ class Game:
     # Fullscreen
     is_fullscreen = True
 
+    # Only these events are put into the event queue - all others are dropped by SDL
+    # Focus and window events are kept, so losing focus or exposing the window (fullscreen) is still handled by SDL
+    ALLOWED_EVENTS = [
+        pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN,
+        pygame.ACTIVEEVENT, pygame.WINDOWFOCUSLOST, pygame.WINDOWFOCUSGAINED, pygame.VIDEOEXPOSE,
+    ]
+    # Print percentiles of the time from queued input events to the frames showing their effect (see InputLatencyProbe)
+    INPUT_LATENCY_PROBE = False
+
+    # Report every surface that is blitted onto the screen in a format different from the display (slow blit path)
+    DEBUG_SURFACE_FORMATS = False
+
+    # Render resolution - the game is drawn at this fraction of the screen resolution and scaled to the screen once per frame
+    RENDER_SCALE = 1.0
+    # Maximum render height (pixels) - e.g. 4K screens are drawn at 1080p, None draws at full resolution
+    RENDER_MAX_HEIGHT = 1080
+
 
     def __init__(self):
         # Get actual screen size of user
         info = pygame.display.Info()
-        self.ACTUAL_SCREEN_WIDTH, self.ACTUAL_SCREEN_HEIGHT = info.current_w, info.current_h
+        self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT = info.current_w, info.current_h
+
+        # The game is drawn (and all assets are scaled) at the render resolution
+        # All lengths below are relative to it - the finished frame is scaled to the actual screen size in present()
+        self.ACTUAL_SCREEN_WIDTH, self.ACTUAL_SCREEN_HEIGHT = self.get_render_resolution()
+
+        # Unused events don't have to be queued and handled
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(self.ALLOWED_EVENTS)
+        if self.INPUT_LATENCY_PROBE:
+            pygame.event.set_allowed(InputLatencyProbe.EVENT)
+
+        # Player controls - key events are applied as they arrive (see KeyboardInput)
+        self.keyboard = KeyboardInput(
+            (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT), self.INPUT_LATENCY_PROBE
+        )
 
         # Initialize fonts
         self.font_timer = pygame.font.Font(resource_path('fonts/Pixeltype.ttf'), self.TIMER_FONT_SIZE)
         self.font_high_score = pygame.font.Font(resource_path('fonts/Pixeltype.ttf'), self.HIGH_SCORE_FONT_SIZE)
+        self.font_leaderboard = pygame.font.Font(resource_path('fonts/Pixeltype.ttf'), self.LEADERBOARD_FONT_SIZE)
+        self.font_statistics = pygame.font.Font(resource_path('fonts/Pixeltype.ttf'), self.STATISTICS_FONT_SIZE)
 
         # High score (final timer string)
         self.high_score = None
 
+        # Persistent high scores - only their index is read on launch
+        self.high_scores = self.open_high_scores()
+        self.high_score_rank = None  # Rank of the last run in the leaderboard (None if it is not in it)
+
+        # The current run is recorded, while the ghost of the best run is replayed (see start_ghost_run())
+        self.ghost_recorder = None
+        self.ghost_replay = None
+        self.ghost_position = None
+
         # Counter for increasing difficulty
         self.difficulty_increase_counter = 0
 
@@ -163,6 +315,11 @@ class Game:
         self.BACKGROUND_WIDTH = int(180 * self.perc_W)
         self.BACKGROUND_HEIGHT = int(75 * self.perc_H)
 
+        # Road chunks are whole canopy tiles wide, so every chunk has its own columns of tree tops
+        self.ROAD_CHUNK_WIDTH_PX = max(1, int(self.ROAD_CHUNK_WIDTH * self.perc_W) // self.CANOPY_TILE_SIZE) * self.CANOPY_TILE_SIZE
+        # Chunks on the screen (at most) and the next one
+        self.ROAD_RESIDENT_CHUNKS = -(-self.ACTUAL_SCREEN_WIDTH // self.ROAD_CHUNK_WIDTH_PX) + 2
+
         # Player size
         self.PLAYER_WIDTH = int(5.9 * self.perc_W)
         self.PLAYER_HEIGHT = int(5 * self.perc_H)
@@ -179,6 +336,11 @@ class Game:
         self.PEDESTRIAN_WIDTH = int(3.5 * self.perc_W)
         self.PEDESTRIAN_HEIGHT = int(3 * self.perc_H)
 
+        # Texture resolution of the backgrounds, trees and sprites - depends on the sizes above
+        self.texture_quality = self.create_texture_quality()
+        if self.TEXTURE_MEMORY_REPORT:
+            print(self.texture_quality.get_summary())
+
         # Define minimum and maximum car positions - invisible barriers, the player can not pass through
         self.MIN_Y = self.ACTUAL_SCREEN_HEIGHT // 8 + int(3 * self.perc_H)
         self.MAX_Y = (self.ACTUAL_SCREEN_HEIGHT // 8) * 7 - int(2 * self.perc_H)
@@ -207,6 +369,10 @@ class Game:
 
         # Initialize lists for enemies, bikes, pedestrians
         self.enemies = []
+        self.traffic = TrafficModel(
+            self.CAR_BUDGET, self.CAR_LANE_SPEEDS, self.CAR_MIN_GAP * self.perc_W, self.CAR_FOLLOWING_DISTANCE * self.perc_W,
+            self.CAR_GAP_GAIN, self.CAR_ACCELERATION, self.CAR_BRAKING
+        )
         self.bikes = []
         self.pedestrians = []
 
@@ -223,11 +389,28 @@ class Game:
         self.transition_start_time = None
         self.reverse_transition = False
 
-        # Initialize screen (windowed start screen)
-        self.screen = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), pygame.NOFRAME)
+        # Registry of all loaded surfaces - keeps them in the format of the active display
+        self.assets = AssetRegistry(verbose=self.DEBUG_SURFACE_FORMATS)
+
+        # Index of the current day/night transition image
+        self.transition_index = 0
+
+        # The display is created once, in fullscreen - switching modes between the screens recreates the display,
+        # changes the monitor mode and can change the pixel format of all surfaces
+        self.set_display_mode((self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT), pygame.FULLSCREEN)
 
-        # Initialize game surface
-        self.game_surface = pygame.Surface((self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
+        # The start and game over screen are drawn at their own size (SCREEN_WIDTH x SCREEN_HEIGHT)
+        # and scaled into the centre of the display (see present_scene())
+        self.scene_surface = pygame.Surface((self.SCREEN_WIDTH, self.SCREEN_HEIGHT)).convert()
+        self.scene_rect = self.get_scene_rect()
+        self.scene_view = self.display.subsurface(self.scene_rect)
+        self.show_scene()
+
+        # Capturing every shown frame (see capture_frame())
+        self.frame_capture = self.create_frame_capture() if self.FRAME_CAPTURE else None
+
+        # Initialize game surface (render resolution)
+        self.game_surface = pygame.Surface((self.ACTUAL_SCREEN_WIDTH, self.ACTUAL_SCREEN_HEIGHT)).convert()
 
         # Initialize buttons for various screens
         self.start_button = Button(self.SCREEN_WIDTH // 2 + 110, self.SCREEN_HEIGHT // 2 + 180, "START", font_size=90)
@@ -238,34 +421,60 @@ class Game:
         self.continue_button = Button(self.SCREEN_WIDTH // 2 + 310, self.SCREEN_HEIGHT // 2 + 110, "CONTINUE", font_size=70)
         self.quit_button_game_over_screen = Button(self.SCREEN_WIDTH // 2 - 260, self.SCREEN_HEIGHT // 2 + 110, "QUIT", font_size=60)
 
+        # The mouse position on the display has to be mapped into the scaled scene
+        for button in (self.start_button, self.quit_button_start_screen, self.continue_button, self.quit_button_game_over_screen):
+            button.mouse_scale = (self.SCREEN_WIDTH / self.scene_rect.width, self.SCREEN_HEIGHT / self.scene_rect.height)
+            button.mouse_offset = self.scene_rect.topleft
+
         # Set initial game state
         self.state = self.start_screen
 
+        # Active fade between screens (see begin_transition())
+        self.transition = None
+        # True, if the game objects were already reset during the transition to the main game
+        self.behaviour_prefetched = False
+
         # Initialize time for spawning cars
         self.last_spawn_time = pygame.time.get_ticks()
 
-        # Initialize list for collided enemies - for later version of game
-        self.enemies_collided = []
+        # Statistics of the current run (collisions, canisters, near misses, ...) - kept as running aggregates
+        self.run_statistics = RunStatistics()
+
+        # Quality level, adapted to the measured frame time
+        self.quality_governor = QualityGovernor(
+            self.QUALITY_FRAME_BUDGET_MS, self.QUALITY_WINDOW_FRAMES, self.QUALITY_DOWN_THRESHOLD,
+            self.QUALITY_UP_THRESHOLD, self.QUALITY_UP_WINDOWS, self.QUALITY_FIXED_LEVEL,
+        )
+        self.apply_quality_level()
+
+        # A main game frame is split into systems, which are run and timed by the scheduler (see main_game_frame())
+        self.frame_scheduler = self.create_frame_scheduler()
+        self.timer_surface = None
 
         # Initialize game clock
         self.clock = pygame.time.Clock()
+        self.frame_time = 1000 / 120
+
+        # Exhaust particles, that are due, but not emitted yet (fractions of particles per frame)
+        self.exhaust_particles_due = 0
         
         # Initialize canister variables
         self.remaining_lives = 3
         self.last_canister_spawn_time = 0
         self.canisters = []
 
-        # Load game resources
+        # Load start screen resources (gameplay resources are streamed in on the start screen)
         self.load_resources()
 
 
     def load_resources(self):
         """
-        Loads and prepares all the necessary game resources.
+        Loads the resources of the start screen and starts loading all the other game resources.
 
-        This includes loading and scaling images for the canister, backgrounds, cut-out trees, 
-        enemy cars, bikes, pedestrians, player car, start screen, and game over screen. 
-        It also initializes the current background and tree images, and loads sounds (calls load_sound() method).
+        Only the start screen image and sounds are loaded right away, so the start screen can be shown
+        as fast as possible. All the gameplay resources (canister, backgrounds, cut-out trees, enemy cars, 
+        bikes, pedestrians, player car, game over screen and sounds) are streamed in, 
+        while the player is on the start screen (see gameplay_resource_jobs()).
 
         Author: Florian Goldbach, Christian Gerhold
         """
@@ -273,130 +482,533 @@ class Game:
         # Loading Sounds
         self.load_sound()
 
-        # Loading Canister image
-        self.canister_image = pygame.image.load(resource_path("items/fuel.png")).convert_alpha()  # Loading image
-        self.canister_image = pygame.transform.scale(self.canister_image, (int(2.5*self.perc_W), int(4.5*self.perc_H))) # Scaling
-
-        # Loading background images 
-        self.transition_images = [
-            # .. and scale backgrounds.
-            pygame.transform.scale(
-                # .. rotate ..
-                pygame.transform.rotate(
-                    # Load, ..
-                    pygame.image.load(resource_path(f"backgrounds/day_to_night_transition_long_roads/background_2_day_to_night_{i}.png")).convert(),
-                    90
-                ),
-                (self.BACKGROUND_WIDTH, self.BACKGROUND_HEIGHT)
-            )
-            for i in range(1, 10)
-        ]
+        # Preparing the start screen image
+        self.start_screen_image = pygame.image.load(resource_path("start_screen3.png")).convert()
+        self.start_screen_image = pygame.transform.scale(self.start_screen_image, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
+        self.assets.register("start_screen_image", self.start_screen_image)
+
+        # Files are decoded on a background thread, the start screen loop prepares them (see AssetStreamer)
+        self.asset_streamer = AssetStreamer(self.gameplay_resource_jobs(), on_complete=self.finish_loading_resources)
+
+    def gameplay_resource_jobs(self):
+        """
+        Lists all gameplay resources, that are streamed in while the start screen is shown.
 
-        # Loading cut out tree images
-        self.cut_out_tree_images = [
-            # .. and scale backgrounds.
-            pygame.transform.scale(
-                # .. rotate ..
-                pygame.transform.rotate(
-                    # Load, ..
-                    pygame.image.load(resource_path(f"trees/transparent_background_2_day_to_night_{i}.png")).convert_alpha(),
-                    90
-                ),
-                (self.BACKGROUND_WIDTH, self.BACKGROUND_HEIGHT)
+        Every job is a file (image or sound) and a function, which prepares the decoded file on the main thread.
+        Images are converted to the display format, (rotated and) scaled; sounds get their volume.
+        Backgrounds are cut into the segments of the road on the background thread (see cut_road_segments()).
+        The most important resources for the start of the game come first.
+
+        Returns:
+            list: (relative_path, prepare) tuples.
+
+        Author: Florian Goldbach, Christian Gerhold
+        """
+        # The lists are filled in, once the images are decoded
+        self.road_sources = [None] * 9
+        self.canopy_layers = [None] * 9
+        self.road_join_background = None
+        self.road_join_trees = None
+        self.enemy_images = [None] * 4  # We assume to have 4 enemy car images - this is subject to change when new cars are added
+        self.bike_animation_images = [None] * 3  # 3 bike animation images
+        self.pedestrian1_animation_images = [None] * 3  # 3 pedestrian animation images
+        self.pedestrian2_animation_images = [None] * 3  # 3 pedestrian animation images
+
+        # Backgrounds and trees are kept at the resolution of their quality tier (see TextureQuality)
+        background_size = (self.BACKGROUND_WIDTH, self.BACKGROUND_HEIGHT)
+        tree_scale = self.texture_quality.get_scale("trees")
+
+        def cut_background(image):
+            # Rotate and scale backgrounds and cut them into road segments - on the background thread (no convert() needed)
+            image = pygame.transform.scale(
+                pygame.transform.rotate(image, 90), self.texture_quality.scaled_size("backgrounds", background_size)
             )
-            for i in range(1, 10)
+            return image, self.cut_road_segments(image)
+
+        def background(i, cut_image):
+            # Only the segments are kept - the first image is needed, until the road joins are found
+            image, self.road_sources[i] = cut_image
+            self.road_color_key = image.get_colorkey()
+            if i == 0:
+                self.road_join_background = image
+
+        def scale_trees(image):
+            # Rotate and scale the tree images on the background thread - they are converted on the main thread
+            return pygame.transform.scale(pygame.transform.rotate(image, 90), self.texture_quality.scaled_size("trees", background_size))
+
+        def trees(i, image):
+            cut_out_trees = image.convert_alpha()
+            # Splitting the tree images into tiles, dropping the transparent ones
+            # At a reduced quality tier, the tiles are scaled up to their full size right away - switching
+            # the day/night image only swaps the canopy layer (see set_transition_index())
+            canopy = SparseCanopy(cut_out_trees, self.CANOPY_TILE_SIZE // tree_scale)
+            self.canopy_layers[i] = self.texture_quality.materialise("trees", canopy, None)
+            # The cut out tree images are never drawn - only the first one is kept, until the road joins are found
+            if i == 0:
+                self.road_join_trees = cut_out_trees
+
+        def scale_sprite(image, size):
+            # Sprites are all used at the same time - at a reduced tier they are scaled up right away
+            image = pygame.transform.scale(image, self.texture_quality.scaled_size("sprites", size))
+            return self.texture_quality.materialise("sprites", image, size)
+
+        def sprite(images, i, size, image):
+            images[i] = scale_sprite(pygame.transform.rotate(image.convert_alpha(), 90), size)
+
+        def canister(image):
+            self.canister_image = scale_sprite(image.convert_alpha(), (int(2.5*self.perc_W), int(4.5*self.perc_H))) # Scaling
+
+        def player(image):
+            # This can be used to examplorarily understand how the list enemy_images is formed
+            self.player_image = image.convert_alpha()  # Converting image
+            self.player_image = pygame.transform.rotate(self.player_image, 90)  # Rotating
+            self.player_image = scale_sprite(self.player_image, (self.PLAYER_WIDTH, self.PLAYER_HEIGHT)) # Scaling
+            self.player_rect = self.player_image.get_rect()
+
+        def game_over_screen(image):
+            self.game_over_screen_image = pygame.transform.scale(image.convert(), (self.GAME_OVER_SCREEN_WIDTH, self.GAME_OVER_SCREEN_HEIGHT))
+
+        def explosion(image):
+            self.explosion_image = image.convert_alpha()
+
+        def sound(name, volume, loaded_sound):
+            loaded_sound.set_volume(volume)
+            setattr(self, name, loaded_sound)
+
+        jobs = [
+            ("backgrounds/day_to_night_transition_long_roads/background_2_day_to_night_1.png", partial(background, 0), cut_background),
+            ("trees/transparent_background_2_day_to_night_1.png", partial(trees, 0), scale_trees),
+            ("car2.png", player),
+            ("items/fuel.png", canister),
+        ]
+        jobs += [(f"enemies/enemy{i + 1}.png", partial(sprite, self.enemy_images, i, (self.ENEMY_WIDTH_CAR, self.ENEMY_HEIGHT_CAR))) for i in range(4)]
+        jobs += [(f"enemies/bike1_animation/bike1_animation_part{i + 1}.png", partial(sprite, self.bike_animation_images, i, (self.BIKE_WIDTH, self.BIKE_HEIGHT))) for i in range(3)]
+        jobs += [(f"enemies/pedestrian1_animation/pedestrian1_{i + 1}.png", partial(sprite, self.pedestrian1_animation_images, i, (self.PEDESTRIAN_WIDTH, self.PEDESTRIAN_HEIGHT))) for i in range(3)]
+        jobs += [(f"enemies/pedestrian2_animation/pedestrian2_{i + 1}.png", partial(sprite, self.pedestrian2_animation_images, i, (self.PEDESTRIAN_WIDTH, self.PEDESTRIAN_HEIGHT))) for i in range(3)]
+
+        # Sounds
+        jobs += [
+            ("sounds/soundtrack.wav", partial(sound, "soundtrack", 0.3)),
+            ("sounds/vroom.wav", partial(sound, "vroom", 0.5)),
+            ("sounds/collision.wav", partial(sound, "collision", 0.5)),
+            ("sounds/scream.wav", partial(sound, "scream", 0.5)),  # scream for pedestrian when being hit
+            ("sounds/scream2.mp3", partial(sound, "scream2", 0.5)),
+            ("sounds/bike.wav", partial(sound, "bike_sound", 0.1)),  # bike spawn sound
+            ("sounds/walking.wav", partial(sound, "pedestrian_sound", 0.2)),  # walking sound with spawning a pedestrian
+            ("sounds/canister.WAV", partial(sound, "canister_sound", 0.5)),
+            ("sounds/game_over.wav", partial(sound, "game_over_screen_sound", 1)),
         ]
 
+        # The rest of the day to night transition is needed last
+        jobs += [(f"backgrounds/day_to_night_transition_long_roads/background_2_day_to_night_{i + 1}.png", partial(background, i), cut_background) for i in range(1, 9)]
+        jobs += [(f"trees/transparent_background_2_day_to_night_{i + 1}.png", partial(trees, i), scale_trees) for i in range(1, 9)]
+        jobs.append(("game_over_screen_image.png", game_over_screen))
+        jobs.append(("explosion.gif", explosion))
+
+        return jobs
+
+    def finish_loading_resources(self):
+        """
+        Registers the streamed gameplay resources, once all of them are loaded.
+        """
+        self.assets.register("canister_image", self.canister_image, alpha=True)
+        self.assets.register("canopy_layers", self.canopy_layers, alpha=True)
+        self.assets.register("enemy_images", self.enemy_images, alpha=True)
+        self.assets.register("bike_animation_images", self.bike_animation_images, alpha=True)
+        self.assets.register("pedestrian1_animation_images", self.pedestrian1_animation_images, alpha=True)
+        self.assets.register("pedestrian2_animation_images", self.pedestrian2_animation_images, alpha=True)
+        self.assets.register("player_image", self.player_image, alpha=True)
+        self.assets.register("game_over_screen_image", self.game_over_screen_image)
+
+        # The game surface has to match the display format as well, as it is scaled to the display every frame
+        self.assets.register("game_surface", self.game_surface)
+
+        # Pixel masks for collisions - computed once per sprite frame (they don't change, when the surfaces are converted)
+        self.player_mask = pygame.mask.from_surface(self.player_image)
+        self.canister_mask = pygame.mask.from_surface(self.canister_image)
+        self.enemy_masks = [pygame.mask.from_surface(image) for image in self.enemy_images]
+        self.bike_animation_masks = [pygame.mask.from_surface(image) for image in self.bike_animation_images]
+        self.pedestrian1_animation_masks = [pygame.mask.from_surface(image) for image in self.pedestrian1_animation_images]
+        self.pedestrian2_animation_masks = [pygame.mask.from_surface(image) for image in self.pedestrian2_animation_images]
+
+        # Particles for crash explosions and exhaust smoke
+        self.particles = ParticleSystem(self.PARTICLE_BUDGET, self.create_particle_stamps())
+        self.assets.register("particle_stamps", self.particles.stamps, alpha=True)
+
+        # The chunks of the road are chosen from the segments of the background image (see ProceduralRoad)
+        self.road = ProceduralRoad(
+            self.ROAD_CHUNK_WIDTH_PX, self.BACKGROUND_HEIGHT, self.find_road_joins(), self.bake_road_chunk,
+            self.ROAD_JUMP_CHANCE, self.ROAD_SEED
+        )
+        self.road_join_background = self.road_join_trees = None
+
+        # Tyre marks are drawn onto a layer, that scrolls with the background
+        # The layer holds one slot per resident road chunk - a slot is cleared, when its chunk is evicted
+        self.tyre_marks = DecalLayer(self.ROAD_CHUNK_WIDTH_PX * self.ROAD_RESIDENT_CHUNKS, self.BACKGROUND_HEIGHT)
+        self.assets.register("tyre_marks", self.tyre_marks.surface, alpha=True)
+        # The visible part of the background (with the tyre marks) - only the newly visible strip is drawn every frame
+        self.background_cache = ScrollingBackground()
+
+        # Headlights and taillights at night - one intensity level per day/night transition image
+        self.night_lighting = NightLighting(
+            (self.ENEMY_WIDTH_CAR, self.ENEMY_HEIGHT_CAR), len(self.road_sources), self.NIGHT_LIGHT_INTENSITY
+        )
+        self.assets.register("night_light_sprites", self.night_lighting.sprites)
+
         # Initializing current background and trees
-        self.current_background = self.transition_images[0]
-        self.current_trees = self.cut_out_tree_images[0]
-        
-        # Loading enemy car images
-        self.enemy_images = [
-            # .. and scale enemy cars.
-            pygame.transform.scale(
-                # .. rotate
-                pygame.transform.rotate(
-                    # Load, ..
-                    pygame.image.load(resource_path(f"enemies/enemy{i}.png")).convert_alpha(),
-                    90
-                ),
-                (self.ENEMY_WIDTH_CAR, self.ENEMY_HEIGHT_CAR)
-            )
-            for i in range(1, 5)  # We assume to have 4 enemy car images - this is subject to change when new cars are added
-        ]
+        self.set_transition_index(0)
+        # Game objects use the registered surfaces from now on - they are fetched again only after a display format change
+        self.bind_gameplay_assets()
 
-        # Loading bike images
-        self.bike_animation_images = [
-            pygame.transform.scale(
-                pygame.transform.rotate(
-                    pygame.image.load(resource_path(f"enemies/bike1_animation/bike1_animation_part{i}.png")).convert_alpha(),
-                    90
-                ),
-                (self.BIKE_WIDTH, self.BIKE_HEIGHT)
-            )
-            for i in range(1, 4)  # 3 bike animation images
+        if self.TEXTURE_MEMORY_REPORT:
+            print(self.texture_quality.get_report(self.measure_texture_memory()))
+
+    def create_texture_quality(self):
+        """
+        Chooses the texture quality tier of each asset group for the render resolution (see TextureQuality).
+
+        Returns:
+            TextureQuality: The tiers of the backgrounds, trees and sprites.
+        """
+        background_size = (self.BACKGROUND_WIDTH, self.BACKGROUND_HEIGHT)
+        transition_count = 9
+        road_chunk_size = (self.ROAD_CHUNK_WIDTH_PX, self.BACKGROUND_HEIGHT)
+        textures = {
+            # Only the resident chunks of the road are textures - baked from the compressed segments (see cut_road_segments())
+            # They are scaled up to full size, a reduced tier doesn't save memory here
+            "backgrounds": [(road_chunk_size, self.ROAD_RESIDENT_CHUNKS, self.ROAD_RESIDENT_CHUNKS, 1.0)],
+            # Canopy layers, scaled up to full size when they are loaded (the cut out tree images are dropped after tiling)
+            "trees": [(background_size, transition_count, transition_count, self.CANOPY_COVERAGE_ESTIMATE)],
+            # All sprites can be drawn at the same time
+            "sprites": [
+                ((self.PLAYER_WIDTH, self.PLAYER_HEIGHT), 1, 1, 1.0),
+                ((self.ENEMY_WIDTH_CAR, self.ENEMY_HEIGHT_CAR), 4, 4, 1.0),
+                ((self.BIKE_WIDTH, self.BIKE_HEIGHT), 3, 3, 1.0),
+                ((self.PEDESTRIAN_WIDTH, self.PEDESTRIAN_HEIGHT), 6, 6, 1.0),
+                ((int(2.5*self.perc_W), int(4.5*self.perc_H)), 1, 1, 1.0),
+            ],
+        }
+        budget = self.TEXTURE_MEMORY_BUDGET_MB * 1e6 if self.TEXTURE_MEMORY_BUDGET_MB is not None else None
+        return TextureQuality(textures, budget, self.QUALITY_TIERS)
+
+    def measure_texture_memory(self):
+        """
+        Measures the memory of the loaded textures of each asset group, including the current (scaled up) ones.
+
+        Returns:
+            dict: Bytes of each group.
+        """
+        def size_of(value):
+            if isinstance(value, list):
+                return sum(size_of(item) for item in value)
+            if isinstance(value, SparseCanopy):
+                return sum(size_of(tile) for column in value.columns for tile, _ in column)
+            return value.get_width() * value.get_height() * value.get_bytesize()
+
+        sprites = [
+            self.player_image, self.canister_image, self.enemy_images, self.bike_animation_images,
+            self.pedestrian1_animation_images, self.pedestrian2_animation_images,
         ]
+        loaded = {
+            "backgrounds": sum(size_of(surface) for surface, _, _ in self.road.baked.values()),
+            "trees": size_of(self.canopy_layers),
+            "sprites": size_of(sprites),
+        }
+        # The compressed segments of the road and their packed grass masks
+        loaded["backgrounds"] += sum(len(pixels) + grass_bits.nbytes for segments in self.road_sources for pixels, grass_bits in segments)
+        return loaded
+
+    def create_particle_stamps(self):
+        """
+        Creates the images (stamps) of all particle kinds, for every step of a particle's lifetime.
 
-        # Loading pedestrian images (1 and 2)
-        self.pedestrian1_animation_images = [
-            pygame.transform.scale(
-                pygame.transform.rotate(
-                    pygame.image.load(resource_path(f"enemies/pedestrian1_animation/pedestrian1_{i}.png")).convert_alpha(),
-                    90
-                ),
-                (self.PEDESTRIAN_WIDTH, self.PEDESTRIAN_HEIGHT)
-            )
-            for i in range(1, 4)  # 3 pedestrian animation images
+        Particles are never drawn individually - every particle uses the stamp of its kind and age,
+        so all scaling and fading happens once here.
+        Fire uses the (so far unused) explosion image, smoke and sparks are soft circles.
+
+        Returns:
+            list: One list of surfaces (one per age step) for each particle kind (ParticleSystem.FIRE, SMOKE, SPARK).
+        """
+        def soft_circle(color):
+            size = 32
+            circle = pygame.Surface((size, size), pygame.SRCALPHA)
+            for radius in range(size // 2, 0, -1):
+                alpha = int(255 * (1 - radius / (size / 2)) ** 0.7)
+                pygame.draw.circle(circle, (*color, alpha), (size // 2, size // 2), radius)
+            return circle
+
+        def stamps(image, start_size, end_size, start_alpha, end_alpha):
+            steps = []
+            for step in range(ParticleSystem.AGE_STEPS):
+                age = step / (ParticleSystem.AGE_STEPS - 1)
+                size = max(1, int(start_size + (end_size - start_size) * age))
+                stamp = pygame.transform.smoothscale(image, (size, size))
+                alpha = int(start_alpha + (end_alpha - start_alpha) * age)
+                stamp.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+                steps.append(stamp.convert_alpha())
+            return steps
+
+        return [
+            stamps(self.explosion_image, int(4 * self.perc_W), int(7 * self.perc_W), 255, 0),  # FIRE
+            stamps(soft_circle((90, 90, 90)), int(1 * self.perc_W), int(5 * self.perc_W), 180, 0),  # SMOKE
+            stamps(soft_circle((255, 200, 80)), int(0.8 * self.perc_W), int(0.3 * self.perc_W), 255, 60),  # SPARK
         ]
 
+    def get_render_resolution(self):
+        """
+        Calculates the resolution, the game is drawn at.
+
+        This is RENDER_SCALE times the actual screen size, but at most RENDER_MAX_HEIGHT pixels high.
+        So large screens (4K, ultrawide) cost the same per frame as a 1080p screen.
+        The render resolution is never larger than the actual screen.
 
-        self.pedestrian2_animation_images = [
-            pygame.transform.scale(
-                pygame.transform.rotate(
-                    pygame.image.load(resource_path(f"enemies/pedestrian2_animation/pedestrian2_{i}.png")).convert_alpha(),
-                    90
-                ),
-                (self.PEDESTRIAN_WIDTH, self.PEDESTRIAN_HEIGHT)
-            )
-            for i in range(1, 4)  # 3 pedestrian animation images
-        ]  
+        Returns:
+            tuple: Width and height of the render resolution.
+        """
+        scale = min(1.0, self.RENDER_SCALE)
+        if self.RENDER_MAX_HEIGHT is not None:
+            scale = min(scale, self.RENDER_MAX_HEIGHT / self.DISPLAY_HEIGHT)
 
-        # This can be used to examplorarily understand how the lists enemy_images and transition_images are formed
-        self.player_image = pygame.image.load(resource_path("car2.png")).convert_alpha()  # Loading image
-        self.player_image = pygame.transform.rotate(self.player_image, 90)  # Rotating
-        self.player_image = pygame.transform.scale(self.player_image, (self.PLAYER_WIDTH, self.PLAYER_HEIGHT)) # Scaling
-        self.player_rect = self.player_image.get_rect()
+        return int(self.DISPLAY_WIDTH * scale), int(self.DISPLAY_HEIGHT * scale)
 
-        # Preparing the start screen image
-        self.start_screen_image = pygame.image.load(resource_path("start_screen3.png")).convert()
-        self.start_screen_image = pygame.transform.scale(self.start_screen_image, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
+    def is_render_scaled(self):
+        return (self.ACTUAL_SCREEN_WIDTH, self.ACTUAL_SCREEN_HEIGHT) != (self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT)
+
+    def get_scene_rect(self):
+        """
+        Returns the part of the display the start and game over screen are shown in.
+
+        The scenes are scaled as large as possible, keeping their aspect ratio, and centred (black borders on the sides).
+        """
+        scale = min(self.DISPLAY_WIDTH / self.SCREEN_WIDTH, self.DISPLAY_HEIGHT / self.SCREEN_HEIGHT)
+        scene_rect = pygame.Rect(0, 0, int(self.SCREEN_WIDTH * scale), int(self.SCREEN_HEIGHT * scale))
+        scene_rect.center = (self.DISPLAY_WIDTH // 2, self.DISPLAY_HEIGHT // 2)
+        return scene_rect
+
+    def show_scene(self):
+        """
+        Makes the scene surface the render target - for the start and game over screen (see present_scene()).
+        """
+        self.set_render_target(self.scene_surface)
+        # Only the scene rect is drawn from now on - the borders stay black
+        self.display.fill(self.BG_COLOR)
+
+    def present_scene(self):
+        """
+        Shows the finished frame of the start or game over screen, scaled into the centre of the display.
+        """
+        pygame.transform.scale(self.scene_surface, self.scene_rect.size, self.scene_view)
+        pygame.display.update()
+        self.capture_frame()
+
+    def set_display_mode(self, size, flags=0):
+        """
+        Changes the display mode and updates self.screen.
+
+        All set_mode calls go through here, so the asset registry notices when the
+        display format changes and converts the cached surfaces again (lazily, on their next use).
+        With DEBUG_SURFACE_FORMATS enabled, self.screen reports every blit of a surface in a mismatched format.
+
+        Args:
+            size (tuple): Width and height of the new display.
+            flags (int): Pygame display flags (e.g. pygame.FULLSCREEN or pygame.NOFRAME).
+        """
+        self.display = pygame.display.set_mode(size, flags)
+        self.assets.notice_mode_change()
+        # The display can get another size than requested (e.g. the closest fullscreen mode) - scaling and the scene rect use the actual size
+        self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT = self.display.get_size()
+
+        self.set_render_target(self.display)
+
+    def set_render_target(self, surface):
+        """
+        Sets the surface everything is drawn on (self.screen).
+
+        This is the display itself or the game surface (render resolution) in the main game,
+        and the scene surface on the start and game over screen.
+        """
+        self.screen = surface
+
+        if self.DEBUG_SURFACE_FORMATS:
+            self.screen = FormatCheckingSurface(self.screen, self.assets)
+
+    def present(self):
+        """
+        Shows the finished frame on the screen.
+
+        If the game is drawn at a lower render resolution, the game surface is scaled to the display first.
+        This is the only full screen operation at the actual screen resolution.
+        """
+        if self.is_render_scaled():
+            pygame.transform.scale(self.game_surface, self.display.get_size(), self.display)
+        pygame.display.update()
+        self.capture_frame()
+        if self.keyboard.latency_probe is not None:
+            self.keyboard.latency_probe.frame_presented()
+
+    def bind_gameplay_assets(self):
+        """
+        Fetches all gameplay surfaces from the asset registry.
+
+        If the display format changed since the surfaces were converted, the registry converts them
+        to the new format now. Game objects keep references to their images, 
+        so this has to be called before they are (re-)spawned.
+        The surfaces are bound once after loading - later calls only do something after a display mode change.
+        """
+        if self.bound_format_key == self.assets.format_key:
+            return
+        self.bound_format_key = self.assets.format_key
+
+        self.canister_image = self.assets.get("canister_image")
+        self.canopy_layers = self.assets.get("canopy_layers")
+        self.enemy_images = self.assets.get("enemy_images")
+        self.bike_animation_images = self.assets.get("bike_animation_images")
+        self.pedestrian1_animation_images = self.assets.get("pedestrian1_animation_images")
+        self.pedestrian2_animation_images = self.assets.get("pedestrian2_animation_images")
+        self.player_image = self.assets.get("player_image")
+        self.ghost_image = self.player_image.copy()
+        self.ghost_image.set_alpha(self.GHOST_ALPHA)
+        self.particles.stamps = self.assets.get("particle_stamps")
+        self.tyre_marks.surface = self.assets.get("tyre_marks")
+        self.night_lighting.set_sprites(self.assets.get("night_light_sprites"))
+
+        # The current trees have to point to the converted images as well, the road chunks are baked again
+        self.set_transition_index(self.transition_index)
+        self.road.refresh()
+
+    def set_transition_index(self, transition_index):
+        """
+        Sets the current background and trees to the day/night transition image at transition_index.
+        """
+        self.transition_index = transition_index
+
+        # The canopy layers are already at their full size - only the road is updated, when the image changed
+        segments, canopy = self.road_sources[transition_index], self.canopy_layers[transition_index]
+        self.current_canopy = canopy
+        if self.transition_sources != (segments, canopy):
+            self.transition_sources = (segments, canopy)
+            # The resident chunks are baked from the new segments one per frame (see ProceduralRoad.update())
+            self.road.set_source(segments)
+
+    def find_road_joins(self):
+        """
+        Finds the segments of the background image, that each segment can be followed by (see ProceduralRoad.find_joins()).
+
+        The joins are found on the first day/night image - all images show the same road.
+
+        Returns:
+            list: For each segment the segments, that can follow it (apart from the next one).
+        """
+        background = self.road_join_background
+        segment_width = self.get_road_segment_size()[0]
+        # The trees may be kept at another quality tier - their alpha is compared at the size of the background
+        trees = pygame.transform.scale(self.road_join_trees, background.get_size())
+        return ProceduralRoad.find_joins(background, trees, segment_width, self.ROAD_JOIN_TOLERANCE)
+
+    def get_road_segment_size(self):
+        # Size of the road segments at the quality tier of the backgrounds
+        scale = self.texture_quality.get_scale("backgrounds")
+        return self.ROAD_CHUNK_WIDTH_PX // scale, self.BACKGROUND_HEIGHT // scale
+
+    def cut_road_segments(self, background):
+        """
+        Cuts a day/night background image into the segments of the road, so the image itself doesn't have to be kept.
+
+        The pixels of each segment are compressed (the backgrounds are mostly flat colors), 
+        its grass mask (see get_grass_mask()) is computed once here and packed into bits.
+        This runs on the background thread of the asset streamer.
+
+        Args:
+            background (pygame.Surface): The rotated and scaled background image.
+
+        Returns:
+            list: (compressed RGB pixels, packed grass mask) of each segment.
+        """
+        segment_width, height = self.get_road_segment_size()
+        grass_mask = self.get_grass_mask(background)
+        segments = []
+        for x in range(0, background.get_width() - segment_width + 1, segment_width):
+            pixels = pygame.image.tobytes(background.subsurface((x, 0, segment_width, height)), "RGB")
+            segments.append((zlib.compress(pixels, 1), np.packbits(grass_mask[x:x + segment_width], axis=1)))
+        return segments
+
+    def bake_road_chunk(self, segment):
+        """
+        Unpacks a segment of the current day/night image and scales it up to its full size (at a reduced quality tier).
+
+        Args:
+            segment (int): Index of the segment.
 
-        # Preparing the game over screen image
-        self.game_over_screen_image = pygame.image.load(resource_path("game_over_screen_image.png")).convert()
-        self.game_over_screen_image = pygame.transform.scale(self.game_over_screen_image, (self.GAME_OVER_SCREEN_WIDTH, self.GAME_OVER_SCREEN_HEIGHT))
+        Returns:
+            tuple: The chunk surface and its grass mask (at the resolution of the segment).
+        """
+        pixels, grass_bits = self.road.source[segment]
+        size = self.get_road_segment_size()
+        segment_surface = pygame.image.frombuffer(zlib.decompress(pixels), size, "RGB").convert()
+        surface = self.texture_quality.materialise(
+            "backgrounds", segment_surface, (self.ROAD_CHUNK_WIDTH_PX, self.BACKGROUND_HEIGHT)
+        )
+        surface.set_colorkey(self.road_color_key)
+        return surface, np.unpackbits(grass_bits, axis=1, count=size[1]).astype(bool)
+
+    @staticmethod
+    def get_grass_mask(background):
+        """
+        Returns a boolean array (x, y), which is True, where the background shows grass (green).
+
+        Reading single pixels with get_at() locks the surface - for RLE accelerated surfaces
+        this decodes the whole image every time. The mask is computed once per background image instead (see cut_road_segments()).
+        """
+        pixels = pygame.surfarray.array3d(background).astype(np.int16)
+        red, green, blue = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+        return (green > red + 15) & (green > blue + 15)
 
     def initialize_behaviour(self):
         """
         Initialize the game behavior and set initial parameters.
 
-        This method sets up the game environment, including screen mode,
-        player's position, speed, acceleration, and initializes various game
-        elements such as enemies, bikes, pedestrians, and canisters. It also
-        initializes timers for bike, pedestrian, and fuel spawns and spawns
-        an initial car.
+        This method sets up the game environment, including the surfaces to draw,
+        and resets the player and all game elements (see reset_behaviour()).
+        The reset is skipped, when it was already done during the transition from the start 
+        or game over screen (see prefetch_main_game()).
 
         Authors: Florian Goldbach, Christian Gerhold
         """
-        # Starting in Fullscreen - Here you can decide in which mode to start
-        self.screen = pygame.display.set_mode(
-            (self.ACTUAL_SCREEN_WIDTH, self.ACTUAL_SCREEN_HEIGHT), pygame.FULLSCREEN
-        )
-        # self.screen = pygame.display.set_mode(
-        #     (self.SCREEN_WIDTH, self.SCREEN_HEIGHT), pygame.NOFRAME
-        # )
+        # The main game is drawn onto the display (fullscreen) - it was created in that mode already
+        self.set_render_target(self.display)
         self.is_fullscreen = True
 
+        # Surfaces have to match the format of the new display mode
+        # If they had to be converted, game objects prepared during the transition still use the old surfaces
+        player_image = self.player_image
+        self.bind_gameplay_assets()
+        if self.player_image is not player_image:
+            self.behaviour_prefetched = False
+
+        # Drawing at render resolution - the mouse position has to be scaled the same way for the QUIT button
+        if self.is_render_scaled():
+            self.game_surface = self.assets.get("game_surface")
+            self.set_render_target(self.game_surface)
+            self.quit_button.mouse_scale = (
+                self.ACTUAL_SCREEN_WIDTH / self.DISPLAY_WIDTH, self.ACTUAL_SCREEN_HEIGHT / self.DISPLAY_HEIGHT
+            )
+
+        # Game objects were already reset during the transition to the main game (see prefetch_main_game())
+        if self.behaviour_prefetched:
+            self.behaviour_prefetched = False
+            return
+
+        self.reset_behaviour()
+
+    def reset_behaviour(self):
+        """
+        Resets the player and removes all game objects.
+
+        Resets the player's position, speed and acceleration, removes all enemies, bikes, pedestrians and canisters,
+        resets the spawn timers for bikes, pedestrians and fuel and spawns an initial car.
+
+        Authors: Florian Goldbach, Christian Gerhold
+        """
         self.player_rect.centerx = self.SCREEN_WIDTH // 4  # Change position on the X-axis
         self.player_rect.centery = (
             random.choice(self.car_lanes_fullscreen)
@@ -409,6 +1021,7 @@ class Game:
 
         # Remove enemy cars and bikes
         self.enemies = []
+        self.traffic.clear()
         self.bikes = []
         self.pedestrians = []
         self.canisters = []
@@ -438,15 +1051,14 @@ class Game:
         self.screen.fill(self.BG_COLOR)
 
         scaled_width = int(2.5*self.perc_W)
-        scaled_height = int(4.5*self.perc_H)
         distance_left = int(1.5*self.perc_W)
 
-        fuel_image = pygame.image.load(resource_path("./items/fuel.png")).convert_alpha()
-        scaled_image = pygame.transform.scale(fuel_image, (scaled_width, scaled_height))
+        # The canister image already has the size of the fuel icons - no need to load it every frame
+        fuel_image = self.canister_image
 
         # remaining lives
         for i in range(self.remaining_lives):
-            self.screen.blit(scaled_image,  (distance_left + i * (scaled_width + int(0.5*self.perc_W)), int(6*self.perc_H)))
+            self.screen.blit(fuel_image,  (distance_left + i * (scaled_width + int(0.5*self.perc_W)), int(6*self.perc_H)))
 
 
     def handle_canister_collision(self, canister):
@@ -460,59 +1072,109 @@ class Game:
         """
         print("Picked up canister!")
         self.remaining_lives += 1  # add a canister/live
+        self.run_statistics.canisters_collected += 1
         self.canister_sound.play()
         self.canisters.remove(canister)
 
     def spawn_canister(self):
 
-        new_canister = Canister(self.ACTUAL_SCREEN_WIDTH + int(4*self.perc_W), random.randint(self.MIN_Y, self.MAX_Y - int(3*self.perc_H)), random.choice([7, 8, 9]), self.canister_image)
+        new_canister = Canister(self.ACTUAL_SCREEN_WIDTH + int(4*self.perc_W), random.randint(self.MIN_Y, self.MAX_Y - int(3*self.perc_H)), random.choice([7, 8, 9]), self.canister_image, self.canister_mask)
         self.canisters.append(new_canister)
 
 
-    def handle_canister_behaviour(self):
+    def begin_transition(self, on_complete, duration=1200, prefetch=None):
+        """
+        Starts a transition, which fades the screen to black over the given duration.
 
-        # Drawing, moving, collecting, removing canisters
-        for canister in self.canisters:
-            canister.draw(self.screen)
-            canister.move()
+        The transition does not block: the screen loops keep running and call update_transition() every frame.
+        While the screen fades, the prefetch generator prepares the next screen, one step at a time.
+        Once the fade is over and the prefetch is done, on_complete() is called (usually changes self.state).
 
-            if self.player_rect.colliderect(canister.rect):
-                self.handle_canister_collision(canister)
+        Args:
+            on_complete (callable): Called when the transition is finished.
+            duration (int): Duration of the fade in milliseconds.
+            prefetch (generator, optional): Work for the next screen, split into steps by yield.
+        """
+        self.transition = SceneTransition(on_complete, duration, prefetch)
 
-            # Remove canisters that are out of the screen
-            if canister.rect.right < 0:
-                self.canisters.remove(canister)
-    
+    def update_transition(self):
+        """
+        Advances the active transition and draws the fade on the screen.
 
-    def handle_pedestrian_behaviour(self):
+        Returns:
+            bool: True if a transition was completed in this frame, False otherwise.
+        """
+        if self.transition is None:
+            return False
 
-        for pedestrian in self.pedestrians:
-            pedestrian.animate()
-            pedestrian.move()
-            pedestrian.draw(self.screen)    
-        
-            # Removing pedestrians
-            if pedestrian.rect.right < 0:
-                    self.pedestrians.remove(pedestrian)
+        if self.transition.update(self.screen):
+            transition = self.transition
+            self.transition = None
+            transition.on_complete()
+            return True
 
+        return False
 
-    def fade_to_black(self, duration=2000):
+    def prefetch_main_game(self):
         """
-        Fades the screen to black over a specified duration.
-
-        This is mostly used, so that the vroom sound can be heard :)
+        Prepares the main game, while the start or game over screen fades to black.
 
-        Author: Florian Goldbach
+        Resets the game parameters of the last run, converts the gameplay surfaces,
+        resets all game objects and draws a first (invisible) frame of the road, 
+        so none of this has to be done after the fade.
+        This is a generator - every yield gives the screen a chance to draw the next frame of the fade.
+        """
+        # Statistics of the next run
+        self.run_statistics.reset()
+        self.remaining_lives = 3
+        self.difficulty_increase_counter = 0
+        self.car_spawn_time = 3000
+        self.bike_spawn_time = 10000
+        self.pedestrian_spawn_time = 6000
+        yield
+
+        # Converting the gameplay surfaces (if the display format changed)
+        self.bind_gameplay_assets()
+        self.particles.clear()
+        self.tyre_marks.clear()
+        yield
+
+        # The game is played in fullscreen
+        self.is_fullscreen = True
+        self.reset_behaviour()
+        self.behaviour_prefetched = True
+        yield
+
+        # Baking the visible chunks of the road and drawing them once, so all of their surfaces are ready for the first frame
+        warm_up_surface = self.game_surface
+        self.road.update(self.bg_x, self.ACTUAL_SCREEN_WIDTH)
+        self.road.draw(warm_up_surface, self.bg_x, self.ACTUAL_SCREEN_HEIGHT // 8)
+        yield
+        self.draw_canopy(warm_up_surface, opaque_only=False)
+
+    def change_to_main_game(self):
         """
-        fade_surface = pygame.Surface((self.screen.get_width(), self.screen.get_height()))
-        fade_surface.fill((0, 0, 0))
+        Starts the main game, once the transition from the start or game over screen is finished.
 
-        for alpha in range(0, 256//4):
-            fade_surface.set_alpha(alpha)
-            self.screen.blit(fade_surface, (0, 0))
-            pygame.display.update()
-            pygame.time.delay(duration // (256//4))  # Total duration divided by number of alpha increments
+        Author: Florian Goldbach, Christian Gerhold
+        """
+        # self.play_start_button_sound() # Aufruf des start button
+        self.stop_all_sounds()
+        self.start_time = pygame.time.get_ticks() # Start time of main game, used for night day cycle
+        self.wave_cycle_start_time = pygame.time.get_ticks() # Also start time of game, but used for wave cycle
+        self.timer_start_time = pygame.time.get_ticks() # Used for timer
+        self.keyboard.sync()  # Key events of the other screens were not applied
+        self.start_ghost_run()
+        self.state = self.main_game
+
+    def quit_game(self):
+        """
+        Closes the window and exits the game.
 
+        Author: Florian Goldbach
+        """
+        pygame.quit()
+        sys.exit()
 
     def will_collide(self, new_enemy_rect):
         """
@@ -571,10 +1233,12 @@ class Game:
         Selects a random image for the enemy car and sets its initial position just outside the screen.
         The car's vertical position is slightly randomized within the lane limits. The method attempts 
         to spawn the car without causing a collision, up to a maximum number of attempts.
+        The car drives at a speed from the distribution of its lane (see TrafficModel).
 
         Author: Florian Goldbach, Christian Gerhold
         """
-        enemy_image = random.choice(self.enemy_images)
+        enemy_index = random.randrange(len(self.enemy_images))
+        enemy_image = self.enemy_images[enemy_index]
         enemy_rect = enemy_image.get_rect()
 
         enemy_rect.centerx = self.ACTUAL_SCREEN_WIDTH if self.is_fullscreen else self.SCREEN_WIDTH
@@ -583,21 +1247,17 @@ class Game:
 
         for _ in range(attempts):
             # Slighty randomizing Y spawn position
-            enemy_rect.centery = random.choice(self.car_lanes_fullscreen) + random.randint(- int(2*self.perc_H), int(2*self.perc_H)) if self.is_fullscreen else random.choice(self.car_lanes_windowed)
+            lane = random.randrange(len(self.car_lanes_fullscreen))
+            enemy_rect.centery = self.car_lanes_fullscreen[lane] + random.randint(- int(2*self.perc_H), int(2*self.perc_H)) if self.is_fullscreen else self.car_lanes_windowed[lane]
             if not self.will_collide(enemy_rect):
-                enemy_speed = self.ENEMY_SPEED
-                self.enemies.append({"image": enemy_image, "rect": enemy_rect, "speed": enemy_speed})
+                # The traffic model moves the car - with a sub-pixel position
+                slot = self.traffic.add(lane, enemy_rect.centerx, enemy_rect.width)
+                if slot is not None:
+                    self.enemies.append({
+                        "image": enemy_image, "mask": self.enemy_masks[enemy_index], "rect": enemy_rect, "passed": False, "slot": slot,
+                    })
                 break
 
-    def load_canister_sound(self):
-        """
-        Loads the canister pickup sound effect and sets its volume.
-        
-        Author: Christian Gerhold
-        """
-        self.canister_sound = pygame.mixer.Sound(resource_path("./sounds/canister.wav"))
-        self.canister_sound.set_volume(0.5)
-
     def play_canister_sound(self):
         """
         Plays the canister pickup sound effect on a specified audio channel.
@@ -607,16 +1267,6 @@ class Game:
         self.canister_sound.play()
         pygame.mixer.Channel(5).play(self.canister_sound)
 
-    def load_bike_sound(self):
-        """
-        Loads the bike spawn sound effect and sets its volume.
-
-        Author: Christian Gerhold
-        """
-        # load bike sound
-        self.bike_sound = pygame.mixer.Sound(resource_path("./sounds/bike.wav"))
-        self.bike_sound.set_volume(0.1)
-
     def play_bike_sound(self):
         """
         Plays the bike spawn sound effect on a specified audio channel.
@@ -626,15 +1276,6 @@ class Game:
         self.bike_sound.play()
         pygame.mixer.Channel(1).play(self.bike_sound)
 
-    def load_pedestrian_sound(self):
-        """
-        Loads the pedestrian walking sound effect and sets its volume.
-
-        Author: Christian Gerhold.
-        """
-        self.pedestrian_sound = pygame.mixer.Sound(resource_path("./sounds/walking.wav"))
-        self.pedestrian_sound.set_volume(0.2)
-
     def play_pedestrian_sound(self):
         """
         Plays the pedestrian walking sound effect on a specified audio channel.
@@ -655,7 +1296,7 @@ class Game:
         Author: Florian Goldbach, Christian Gerhold
         """
         # Also slighty randomizing Y spawn position and speed
-        new_bike = Bike(self.ACTUAL_SCREEN_WIDTH + int(4*self.perc_W), random.choice(self.bike_lanes_fullscreen) + random.randint(-int(0.7*self.perc_H), int(0.7*self.perc_H)), random.randint(4, 6), self.bike_animation_images)
+        new_bike = Bike(self.ACTUAL_SCREEN_WIDTH + int(4*self.perc_W), random.choice(self.bike_lanes_fullscreen) + random.randint(-int(0.7*self.perc_H), int(0.7*self.perc_H)), random.randint(4, 6), self.bike_animation_images, self.bike_animation_masks)
         self.bikes.append(new_bike)
         # sound for spawning bike
         self.play_bike_sound()  # Aufruf des bike spawn sounds
@@ -672,20 +1313,42 @@ class Game:
         Author: Florian Goldbach, Christian Gerhold
         """
         # Randomly choose between the two types of pedestrians
-        chosen_pedestrian_images = random.choice([self.pedestrian1_animation_images, self.pedestrian2_animation_images])
+        chosen_pedestrian_images, chosen_pedestrian_masks = random.choice([
+            (self.pedestrian1_animation_images, self.pedestrian1_animation_masks),
+            (self.pedestrian2_animation_images, self.pedestrian2_animation_masks),
+        ])
     
         # Also slighty randomizing Y spawn position and speed
-        new_pedestrian = Pedestrian(self.ACTUAL_SCREEN_WIDTH + int(4*self.perc_W), random.choice(self.side_walk_lanes) + random.randint(-int(1.5*self.perc_H), int(1.5*self.perc_H)), random.choice([3.2, 3.3, 3.5]), chosen_pedestrian_images)
+        new_pedestrian = Pedestrian(self.ACTUAL_SCREEN_WIDTH + int(4*self.perc_W), random.choice(self.side_walk_lanes) + random.randint(-int(1.5*self.perc_H), int(1.5*self.perc_H)), random.choice([3.2, 3.3, 3.5]), chosen_pedestrian_images, chosen_pedestrian_masks)
         self.pedestrians.append(new_pedestrian)
         self.play_pedestrian_sound() # walking sound with spawning a pedestrian
 
+    def collides_with_player(self, rect, mask):
+        """
+        Checks if a game object collides with the player car.
+
+        The cheap rectangle test comes first - only if the rectangles overlap, the pixel masks are compared,
+        so the transparent corners of the sprites don't count as a collision.
+
+        Args:
+            rect (pygame.Rect): Rectangle of the game object.
+            mask (pygame.mask.Mask): Pixel mask of the game object's current image.
+
+        Returns:
+            bool: True if a visible pixel of the game object overlaps a visible pixel of the player car.
+        """
+        if not self.player_rect.colliderect(rect):
+            return False
+        offset = (rect.x - self.player_rect.x, rect.y - self.player_rect.y)
+        return self.player_mask.overlap(mask, offset) is not None
+
     def handle_collision(self, collided_with):
         """
         Handles collisions in the game.
 
         Updates the high score based on the current game time (in case game ends after this collision).
         It then plays the collision sound effect, stops the game soundtrack, 
-        and decrements the player's remaining lives. Also records the collided entity for potential future use.
+        and decrements the player's remaining lives. Also counts the collision in the run statistics.
 
         Author: Florian Goldbach
         """
@@ -694,11 +1357,82 @@ class Game:
         self.stop_soundtrack()
         print("GAME OVER")
 
+        # Crash explosion - the particles keep burning, while the player is reset
+        self.emit_crash_particles(collided_with)
+
         # Reduce lives
         self.remaining_lives -= 1
 
-        # List of collided enemies - could be interesting for info at the end of the game - not implemented as of now
-        self.enemies_collided.append(collided_with)
+        # Only the kind of enemy is counted, the enemy itself (with its images) is not kept
+        self.run_statistics.record_collision("car" if isinstance(collided_with, dict) else type(collided_with).__name__.lower())
+
+    def leave_tyre_marks(self):
+        """
+        Draws tyre marks behind the player's rear wheels, while they are on grass.
+
+        Whether a wheel is on grass is decided by the color of the road chunk below it (see get_grass_mask()).
+        The marks are drawn once into the tyre mark layer (in road coordinates, wrapped around the width of the layer),
+        so they scroll with the road and cost no extra blits, however many there are.
+        """
+        background_y = self.ACTUAL_SCREEN_HEIGHT // 8
+        wheel_x = self.player_rect.left + int(0.5 * self.perc_W)
+
+        for wheel, wheel_y in enumerate((self.player_rect.top + int(0.5 * self.perc_H), self.player_rect.bottom - int(0.5 * self.perc_H))):
+            # Position of the wheel on the road
+            road_x = wheel_x - self.bg_x
+            y = wheel_y - background_y
+
+            on_grass = 0 <= y < self.road.height and self.road.is_grass(road_x, y)
+
+            if on_grass:
+                x = road_x % self.tyre_marks.surface.get_width()
+                self.tyre_marks.add_mark(wheel, (x, y), self.TYRE_MARK_COLOR, max(2, int(0.4 * self.perc_H)))
+            else:
+                self.tyre_marks.lift(wheel)
+
+    def draw_night_lights(self):
+        """
+        Draws the headlights and taillights of the player's car and all enemy cars.
+
+        The brightness follows the day/night transition: no lights at day (first transition image),
+        full brightness at night (last transition image).
+        """
+        if self.transition_index == 0:
+            return
+
+        self.night_lighting.draw(self.screen, self.player_rect, self.transition_index)
+        for enemy in self.enemies:
+            self.night_lighting.draw(self.screen, enemy["rect"], self.transition_index, headlights=self.enemy_headlights)
+
+    def emit_crash_particles(self, collided_with):
+        """
+        Emits an explosion (fire, sparks and smoke) where the player crashed into collided_with.
+        """
+        other_rect = collided_with["rect"] if isinstance(collided_with, dict) else collided_with.rect
+        crash_rect = self.player_rect.clip(other_rect)
+        x, y = crash_rect.center if crash_rect.width else self.player_rect.center
+
+        # The road keeps moving to the left - so do the particles (pixels per millisecond)
+        road_speed = self.BACKGROUND_SPEED * 120 / 1000
+
+        density = self.particle_density
+        self.particles.emit(ParticleSystem.FIRE, x, y, int(12 * density), speed=0.08, lifetime=600, drift=(-road_speed, 0))
+        self.particles.emit(ParticleSystem.SPARK, x, y, int(40 * density), speed=0.5, lifetime=500, drift=(-road_speed, 0))
+        self.particles.emit(ParticleSystem.SMOKE, x, y, int(30 * density), speed=0.05, lifetime=1800, drift=(-road_speed, -0.02))
+
+    def emit_exhaust_particles(self, frame_time):
+        """
+        Emits exhaust smoke behind the player's car, EXHAUST_PARTICLES_PER_SECOND on average.
+        """
+        self.exhaust_particles_due += self.EXHAUST_PARTICLES_PER_SECOND * self.particle_density * frame_time / 1000
+        count = int(self.exhaust_particles_due)
+        if count == 0:
+            return
+        self.exhaust_particles_due -= count
+
+        road_speed = self.BACKGROUND_SPEED * 120 / 1000
+        x, y = self.player_rect.left, self.player_rect.centery + int(1 * self.perc_H)
+        self.particles.emit(ParticleSystem.SMOKE, x, y, count, speed=0.02, lifetime=700, drift=(-road_speed, 0), size=0.4)
 
     def get_timer_string(self):
         """
@@ -713,7 +1447,23 @@ class Game:
         
         Author: Florian Goldbach
         """
-        elapsed_time = pygame.time.get_ticks() - self.timer_start_time
+        return self.format_time(self.get_elapsed_time())
+
+    def get_elapsed_time(self):
+        """
+        Returns the elapsed game time in milliseconds.
+
+        Author: Florian Goldbach
+        """
+        return pygame.time.get_ticks() - self.timer_start_time
+
+    @staticmethod
+    def format_time(elapsed_time):
+        """
+        Formats a time in milliseconds into a string in the format 'HH:MM:SS'.
+
+        Author: Florian Goldbach
+        """
         seconds = elapsed_time // 1000
         minutes = seconds // 60
         hours = minutes // 60
@@ -794,15 +1544,47 @@ class Game:
         """
         Displays the current game timer on the screen.
 
-        Retrieves the formatted game time as a string and renders it on the screen 
-        using the designated font and position.
+        The timer text is rendered by compose_hud() - it can run on another thread, while the frame is simulated.
+
+        Author: Florian Goldbach
+        """
+        if self.timer_surface is not None:
+            self.screen.blit(self.timer_surface, (int(85*self.perc_W), int(7*self.perc_H)))
+
+    def compose_hud(self):
+        """
+        Retrieves the formatted game time as a string and renders it using the designated font.
 
         Author: Florian Goldbach
         """
         timer_string = self.get_timer_string()
-        timer_surface = self.font_timer.render(timer_string, True, self.WHITE)
-        self.screen.blit(timer_surface, (int(85*self.perc_W), int(7*self.perc_H)))
+        self.timer_surface = self.font_timer.render(timer_string, True, self.WHITE)
     
+    def display_quality_level(self):
+        """
+        Displays the current quality level next to the timer (only if the quality governor is on).
+        """
+        if self.QUALITY_GOVERNOR:
+            self.screen.blit(self.quality_level_surface, (int(62*self.perc_W), int(8*self.perc_H)))
+
+    def apply_quality_level(self):
+        """
+        Sets the quality settings for the current level of the quality governor.
+
+        Every level keeps the reductions of the levels below it:
+        1: Bikes and pedestrians animate at half the rate, half as many particles are emitted.
+        2: Only the player's car has headlights at night (enemy cars keep their taillights).
+        3: The canopy is drawn without its transparent edge tiles (no alpha blending).
+        """
+        level = self.quality_governor.level
+        self.animation_interval = 400 if level >= 1 else 200
+        self.particle_density = 0.5 if level >= 1 else 1.0
+        self.enemy_headlights = level < 2
+        self.canopy_opaque_only = level >= 3
+
+        self.quality_level_surface = self.font_statistics.render(f"QUALITY {self.quality_governor.get_level_name()}", True, self.WHITE)
+        print(f"Quality level {level} ({self.quality_governor.get_level_name()})")
+
     def display_high_score(self):
         """
         Displays the high score on the screen.
@@ -815,32 +1597,199 @@ class Game:
         timer_surface = self.font_high_score.render(self.high_score, True, self.BLACK)
         self.screen.blit(timer_surface, (int(20*self.perc_W), int(7*self.perc_H)))
 
-    def is_game_over(self):
+    def create_frame_capture(self):
         """
-        Checks and handles the game over condition.
+        Starts capturing the shown frames into a new file in the capture folder.
 
-        If the player's remaining lives are depleted, it switches the game screen to the 
-        game over screen and updates the game state.
+        Returns:
+            FrameCapture: The capture, or None if the file can't be written or the display format is not supported.
+        """
+        try:
+            folder = os.path.join(self.HIGH_SCORE_DIR, self.FRAME_CAPTURE_FOLDER)
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, time.strftime("capture_%Y%m%d_%H%M%S.bin"))
+            frame_capture = FrameCapture(path, self.display, self.FRAME_CAPTURE_BUFFERS, self.FRAME_CAPTURE_COMPRESSION)
+        except (OSError, ValueError) as error:
+            print(f"Frames are not captured: {error}")
+            return None
+
+        # The frames waiting for the writer are written, when the game is closed
+        atexit.register(frame_capture.close)
+        print(f"Capturing frames to {path}")
+        return frame_capture
+
+    def capture_frame(self):
+        """
+        Captures the frame, that was just shown (if capturing is on).
+        """
+        if self.frame_capture is not None:
+            self.frame_capture.capture(self.display, pygame.time.get_ticks())
 
-        Author: Florian Goldbach
+    def open_high_scores(self):
         """
-        if self.remaining_lives < 1:
-            self.screen = pygame.display.set_mode((self.GAME_OVER_SCREEN_WIDTH, self.GAME_OVER_SCREEN_HEIGHT), pygame.NOFRAME)
-            self.is_fullscreen = False
-            self.state = self.game_over_screen
+        Opens the high score store of this machine.
+
+        Returns:
+            HighScoreStore: The store, or None if the score files can't be read or written (the game works without).
+        """
+        try:
+            return HighScoreStore(self.HIGH_SCORE_DIR, self.HIGH_SCORE_TOP_COUNT, self.HIGH_SCORE_MAX_LOG_RECORDS)
+        except (OSError, ValueError) as error:
+            print(f"High scores are not saved: {error}")
+            return None
+
+    def record_high_score(self):
+        """
+        Adds the time of the finished run to the high scores and remembers its rank for the leaderboard.
+        """
+        self.high_score_rank = None
+        if self.high_scores is None:
+            return
+        try:
+            self.high_score_rank = self.high_scores.add(self.get_elapsed_time())
+        except (OSError, ValueError) as error:
+            print(f"High score is not saved: {error}")
+
+    def check_near_miss(self, enemy):
+        """
+        Counts a near miss, when a car passes the player car closely without a collision.
+
+        Every car is checked once - when its right edge passes the left edge of the player car.
+
+        Args:
+            enemy (dict): The enemy car.
+        """
+        if enemy["passed"] or enemy["rect"].right >= self.player_rect.left:
+            return
+        enemy["passed"] = True
+        gap = max(enemy["rect"].top - self.player_rect.bottom, self.player_rect.top - enemy["rect"].bottom)
+        if gap < self.NEAR_MISS_DISTANCE * self.perc_H:
+            self.run_statistics.near_misses += 1
+
+    def export_run_statistics(self):
+        """
+        Writes the statistics of the finished run to a JSON file next to the high scores.
+        """
+        if self.high_scores is None:
+            return
+        try:
+            self.run_statistics.export(os.path.join(self.HIGH_SCORE_DIR, self.RUN_STATISTICS_FILE))
+        except OSError as error:
+            print(f"Run statistics are not saved: {error}")
+
+    def display_run_statistics(self):
+        """
+        Displays the statistics of the last run on the game over screen.
+        """
+        statistics = self.run_statistics
+        collisions = statistics.collisions
+        frame_time_p50 = statistics.get_frame_time_percentile(50)
+        frame_time_p99 = statistics.get_frame_time_percentile(99)
+        lines = [
+            f"CRASHES  CARS {collisions['car']}  BIKES {collisions['bike']}  PEDESTRIANS {collisions['pedestrian']}",
+            f"CANISTERS {statistics.canisters_collected}   NEAR MISSES {statistics.near_misses}",
+            f"TIME IN WAVES {self.format_time(int(statistics.wave_time))}",
+            f"MOST CARS AT ONCE {statistics.peak_counts['cars']}",
+        ]
+        if frame_time_p50 is not None:
+            lines.append(f"FRAME TIME {frame_time_p50:.1f} MS, P99 {frame_time_p99:.1f} MS")
+
+        line_height = self.font_statistics.get_linesize()
+        for i, line in enumerate(lines):
+            self.screen.blit(self.font_statistics.render(line, True, self.BLACK), (40, 170 + i * line_height))
+
+    def start_ghost_run(self):
+        """
+        Starts recording the player's positions of a new run and starts the ghost of the best run (if there is one).
+        """
+        self.finish_ghost_run(is_best=False)
+        if self.high_scores is None:
+            return
+        try:
+            self.ghost_recorder = GhostRecorder(
+                os.path.join(self.HIGH_SCORE_DIR, self.GHOST_RECORDING_FILE), self.ACTUAL_SCREEN_WIDTH, self.ACTUAL_SCREEN_HEIGHT
+            )
+            ghost_path = os.path.join(self.HIGH_SCORE_DIR, self.GHOST_FILE)
+            if os.path.exists(ghost_path):
+                self.ghost_replay = GhostReplay(ghost_path, self.ACTUAL_SCREEN_WIDTH, self.ACTUAL_SCREEN_HEIGHT)
+        except (OSError, ValueError) as error:
+            print(f"Ghost is not available: {error}")
+
+    def update_ghost(self):
+        """
+        Records the player's position of this tick and moves the ghost to its position of this tick.
+        """
+        if self.ghost_recorder is not None:
+            self.ghost_recorder.record(self.player_rect.x, self.player_rect.y)
+        self.ghost_position = self.ghost_replay.next_position() if self.ghost_replay is not None else None
+
+    def finish_ghost_run(self, is_best):
+        """
+        Stops recording and replaying - the recording replaces the ghost, if the run is the new best one.
+
+        Args:
+            is_best (bool): Whether the finished run is the best run on this machine.
+        """
+        recorder, self.ghost_recorder = self.ghost_recorder, None
+        if self.ghost_replay is not None:
+            self.ghost_replay.close()
+            self.ghost_replay = None
+        self.ghost_position = None
+        if recorder is None:
+            return
+        try:
+            recorder.close()
+            if is_best:
+                os.replace(recorder.path, os.path.join(self.HIGH_SCORE_DIR, self.GHOST_FILE))
+        except OSError as error:
+            print(f"Ghost is not saved: {error}")
+
+    def display_leaderboard(self):
+        """
+        Displays the best times of this machine on the game over screen, marking the last run.
+        """
+        if self.high_scores is None:
+            return
+        line_height = self.font_leaderboard.get_linesize()
+        x = self.GAME_OVER_SCREEN_WIDTH - 260
+        y = 40
+        self.screen.blit(self.font_leaderboard.render("BEST TIMES", True, self.BLACK), (x, y))
+        for rank, (score, _) in enumerate(self.high_scores.top(self.LEADERBOARD_LENGTH)):
+            line_y = y + (rank + 1) * line_height
+            text = f"{rank + 1}. {self.format_time(score)}"
+            self.screen.blit(self.font_leaderboard.render(text, True, self.BLACK), (x, line_y))
+            if rank == self.high_score_rank:
+                self.screen.blit(self.font_leaderboard.render(">", True, self.BLACK), (x - 20, line_y))
+
+    def is_game_over(self):
+        """
+        Checks and handles the game over condition.
+
+        If the player's remaining lives are depleted, it switches the game screen to the 
+        game over screen and updates the game state.
+
+        Author: Florian Goldbach
+        """
+        if self.remaining_lives < 1:
+            self.record_high_score()
+            self.finish_ghost_run(is_best=self.high_score_rank == 0)
+            self.export_run_statistics()
+            self.show_scene()
+            self.is_fullscreen = False
+            self.state = self.game_over_screen
             return
 
     def change_to_start_screen(self):
         """
         Transitions the game to the start screen.
 
-        Changes the display mode to windowed (non-fullscreen) and updates the game state 
+        Draws the start screen as scene (see show_scene()) and updates the game state 
         to show the start screen.
 
         Author: Florian Goldbach
         """
-        # Change display mode, set is_fullscreen to False and update game state
-        self.screen = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), pygame.NOFRAME)
+        # Draw the scene, set is_fullscreen to False and update game state
+        self.show_scene()
         self.is_fullscreen = False
         self.state = self.start_screen
 
@@ -872,26 +1821,23 @@ class Game:
             if not self.reverse_transition:
                 transition_index = time_since_transition_start // self.TRANSITION_SPEED  # e.g. every 5 seconds: time_since_transition_start // 5000
 
-                # We only change the background image, when it is fully on screen ((SCREEN_WIDTH - BACKGROUND_WIDTH) < bg_x <= 0) 
-                # and while we still have new transition images in our list
-                if transition_index < len(self.transition_images) and (self.ACTUAL_SCREEN_WIDTH - self.BACKGROUND_WIDTH) < self.bg_x <= 0:
-                    self.current_background = self.transition_images[transition_index]
-                    self.current_trees = self.cut_out_tree_images[transition_index]
+                # We change the background image, while we still have new transition images in our list
+                # (the chunks of the road on screen are baked from the new image one per frame - see ProceduralRoad)
+                if transition_index < len(self.road_sources):
+                    self.set_transition_index(transition_index)
                 # Once we run out of transition images, we enter the reverse_transition
-                elif transition_index >= len(self.transition_images):
+                elif transition_index >= len(self.road_sources):
                     self.reverse_transition = True
                     self.transition_start_time = pygame.time.get_ticks()
 
             # We keep time of when the reverse transition started and make sure the transition_index counts reversly (e.g. 7 to 0)
             if self.reverse_transition:
                 time_since_reverse_transition = pygame.time.get_ticks() - self.transition_start_time
-                transition_index = len(self.transition_images) - 1 - time_since_reverse_transition // self.TRANSITION_SPEED
+                transition_index = len(self.road_sources) - 1 - time_since_reverse_transition // self.TRANSITION_SPEED
 
-                # We only change the background image, when it is fully on screen ((SCREEN_WIDTH - BACKGROUND_WIDTH) < bg_x <= 0)
-                # and while we still have new transition images in our list
-                if 0 <= transition_index < len(self.transition_images) and (self.ACTUAL_SCREEN_WIDTH - self.BACKGROUND_WIDTH) < self.bg_x <= 0:
-                    self.current_background = self.transition_images[transition_index]
-                    self.current_trees = self.cut_out_tree_images[transition_index]
+                # We change the background image, while we still have new transition images in our list
+                if 0 <= transition_index < len(self.road_sources):
+                    self.set_transition_index(transition_index)
                 # Once we ran out of transitin images, we reset for the next loop
                 elif transition_index < 0:
                     self.start_time = pygame.time.get_ticks()
@@ -930,18 +1876,16 @@ class Game:
     # Start Screen sound
     def load_sound(self):
         """
-        Loads and sets the volume for various sound effects used in the game.
+        Loads and sets the volume for the sound effects of the start screen.
 
-        This includes sounds for the game over screen, start screen, start and quit buttons,
-        general game soundtrack, collision effects, car engine (vroom sound), and screams for pedestrian collisions.
+        This includes sounds for the start screen and the start and quit buttons.
+        All the other sounds (game over screen, soundtrack, collision effects, car engine (vroom sound),
+        screams for pedestrian collisions, bike, pedestrian and canister sounds) are streamed in 
+        with the other gameplay resources (see gameplay_resource_jobs()).
         Each sound is loaded from a file and its volume is set accordingly.
 
         Author: Christian Gerhold, Florian Goldbach
         """
-        # load game over screen sound
-        self.game_over_screen_sound = pygame.mixer.Sound(resource_path("./sounds/game_over.wav"))
-        self.game_over_screen_sound.set_volume(1)
-
         # load start screen sound
         self.start_screen_sound = pygame.mixer.Sound(resource_path("./sounds/start_screen.wav"))
         self.start_screen_sound.set_volume(0.2)
@@ -953,26 +1897,6 @@ class Game:
         # load quit button sound
         self.quit_button_sound = pygame.mixer.Sound(resource_path("./sounds/button_quit_sound.wav"))
         self.quit_button_sound.set_volume(0.5)
-
-        # load soundtrack file
-        self.soundtrack = pygame.mixer.Sound(resource_path("./sounds/soundtrack.wav"))
-        self.soundtrack.set_volume(0.3)
-
-        # load collision file
-        self.collision = pygame.mixer.Sound(resource_path("./sounds/collision.wav"))
-        self.collision.set_volume(0.5)
-
-        # load vroom file
-        self.vroom = pygame.mixer.Sound(resource_path("./sounds/vroom.wav"))
-        self.vroom.set_volume(0.5)
-
-        # load scream for pedestrian when being hit
-        self.scream = pygame.mixer.Sound(resource_path("./sounds/scream.wav"))
-        self.scream.set_volume(0.5)
-
-        # load scream for pedestrian when being hit
-        self.scream2 = pygame.mixer.Sound(resource_path("./sounds/scream2.mp3"))
-        self.scream2.set_volume(0.5)
         
     # start game over sound
     def play_game_over_screen_sound(self):
@@ -1105,18 +2029,18 @@ class Game:
         """
         Calculates and updates the player's speed based on keyboard input.
 
-        Adjusts the player's horizontal and vertical speed based on arrow key inputs.
+        Adjusts the player's horizontal and vertical speed based on arrow key inputs (see KeyboardInput).
         Implements acceleration and deceleration mechanics and limits the player's speed 
         to predefined maximum and minimum values.
 
         Author: Christian Gerhold
         """
         # Bewegung des Spielers
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_UP]:
+        keys = self.keyboard
+        if keys.is_pressed(pygame.K_UP):
             self.player_speed_y -= self.player_acceleration  # Beschleunigen nach oben
             # sound
-        elif keys[pygame.K_DOWN]:
+        elif keys.is_pressed(pygame.K_DOWN):
             self.player_speed_y += self.player_acceleration  # Beschleunigen nach unten
             # sound
         else:
@@ -1125,10 +2049,10 @@ class Game:
             elif self.player_speed_y < 0:
                 self.player_speed_y += self.player_acceleration  # Verlangsamen, wenn keine Taste gedrückt ist
 
-        if keys[pygame.K_LEFT]:
+        if keys.is_pressed(pygame.K_LEFT):
             self.player_speed_x -= self.player_acceleration  # Beschleunigen nach links
             # sound
-        elif keys[pygame.K_RIGHT]:
+        elif keys.is_pressed(pygame.K_RIGHT):
             self.player_speed_x += self.player_acceleration  # Beschleunigen nach rechts
             #self.play_vroom()
         else:
@@ -1141,6 +2065,9 @@ class Game:
         self.player_speed_y = max(self.PLAYER_SPEED_MIN, min(self.PLAYER_SPEED_MAX, self.player_speed_y))
         self.player_speed_x = max(self.PLAYER_SPEED_MIN, min(self.PLAYER_SPEED_MAX, self.player_speed_x))
 
+        # Taps were applied in this tick
+        keys.end_tick()
+
     def stop_all_sounds(self):
         """
         Stops all currently playing sounds.
@@ -1167,49 +2094,71 @@ class Game:
 
         Author: Florian Goldbach, Christian Gerhold
         """
-        self.stop_soundtrack()
+        # When the game was just started, the soundtrack is not even loaded yet
+        if self.asset_streamer.is_done():
+            self.stop_soundtrack()
         self.play_start_screen_sound()  # Sound nur im Startbildschirm abspielen
+
+        # Converted again, if the display format changed
+        self.start_screen_image = self.assets.get("start_screen_image")
+
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     exit()  
-                # The start screen loop will terminate, when the start button is clicked - this will bring the player to the main game loop (follow code)
-                if self.start_button.is_clicked(event):
 
-                    # Remove collided enemies for next game
-                    self.enemies_collided.clear()
-                    self.remaining_lives = 3
-                    self.difficulty_increase_counter = 0
-                    self.car_spawn_time = 3000
-                    self.bike_spawn_time = 10000
-                    self.pedestrian_spawn_time = 6000
+                # Buttons do nothing, while the screen is fading out
+                if self.transition is not None:
+                    continue
 
+                # The start button starts the transition to the main game loop - the start screen loop terminates, when it is finished (follow code)
+                # It only works, once all gameplay resources are loaded
+                if self.asset_streamer.is_done() and self.start_button.is_clicked(event):
                     self.stop_start_screen_sound()
                     self.play_vroom()
-                    self.fade_to_black(duration=1200)
-                    # self.play_start_button_sound() # Aufruf des start button
-                    self.stop_all_sounds()
-                    self.start_time = pygame.time.get_ticks() # Start time of main game, used for night day cycle
-                    self.wave_cycle_start_time = pygame.time.get_ticks() # Also start time of game, but used for wave cycle
-                    self.timer_start_time = pygame.time.get_ticks() # Used for timer
-                    self.state = self.main_game
-                    return
+                    self.begin_transition(self.change_to_main_game, duration=1200, prefetch=self.prefetch_main_game())
                 # The window will be closed when the quit button is pressed
                 if self.quit_button_start_screen.is_clicked(event):
                     self.play_quit_button_sound() # Aufruf des quit button sounds
 
-                    ### delay damit der sound abgespielt wird bevor das fenster schließt
-                    time.sleep(1)
-                    # exit game / start screen
-                    pygame.quit()
-                    sys.exit()
+                    ### fade out, damit der sound abgespielt wird bevor das fenster schließt
+                    self.begin_transition(self.quit_game, duration=1000)
+
+            # Preparing the gameplay resources, loaded in the background
+            self.asset_streamer.pump(self.ASSET_STREAM_BUDGET_MS)
 
             # Drawing
             self.screen.blit(self.start_screen_image, (0, 0))
-            self.start_button.draw(self.screen)
+            if self.asset_streamer.is_done():
+                self.start_button.draw(self.screen)
+            else:
+                self.draw_loading_progress()
             self.quit_button_start_screen.draw(self.screen)
-            pygame.display.update()
+            transition_completed = self.update_transition()
+            self.present_scene()
+
+            if transition_completed:
+                return
+
+    def draw_loading_progress(self):
+        """
+        Draws the loading progress of the gameplay resources in place of the start button.
+        """
+        progress = self.asset_streamer.get_progress()
+        text_img = self.start_button.font.render(f"LOADING {int(progress * 100)}%", True, self.start_button.colors['default'])
+        self.screen.blit(text_img, text_img.get_rect(center=self.start_button.rect.center))
+
+        # Progress bar below the text - drawn with fill(), as self.screen can be a FormatCheckingSurface (see set_render_target())
+        color = self.start_button.colors['default']
+        bar_rect = pygame.Rect(0, 0, self.start_button.rect.width, 6)
+        bar_rect.midtop = (self.start_button.rect.centerx, self.start_button.rect.bottom + 4)
+        for edge in (
+            (bar_rect.x, bar_rect.y, bar_rect.width, 1), (bar_rect.x, bar_rect.bottom - 1, bar_rect.width, 1),
+            (bar_rect.x, bar_rect.y, 1, bar_rect.height), (bar_rect.right - 1, bar_rect.y, 1, bar_rect.height),
+        ):
+            self.screen.fill(color, edge)
+        self.screen.fill(color, (bar_rect.x, bar_rect.y, int(bar_rect.width * progress), bar_rect.height))
 
     def game_over_screen(self):
         """
@@ -1228,49 +2177,44 @@ class Game:
         """
         self.stop_all_sounds()  # Stop all sounds
         self.play_game_over_screen_sound()
+
+        # Converted again, if the display format changed
+        self.game_over_screen_image = self.assets.get("game_over_screen_image")
+
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     exit()
+
+                # Buttons do nothing, while the screen is fading out
+                if self.transition is not None:
+                    continue
                 
-                # The game over screen loop will terminate, when the continue button is clicked - this will bring the player to the main game loop (follow code)
+                # The continue button starts the transition to the main game loop - the game over screen loop terminates, when it is finished (follow code)
                 if self.continue_button.is_clicked(event):
-
-                    # Remove collided enemies for next game
-                    self.enemies_collided.clear()
-                    self.remaining_lives = 3
-                    self.difficulty_increase_counter = 0
-                    self.car_spawn_time = 3000
-                    self.bike_spawn_time = 10000
-                    self.pedestrian_spawn_time = 6000
-
                     self.stop_start_screen_sound()
                     self.play_vroom()
-                    self.fade_to_black(duration=1200)
-                    # self.play_start_button_sound() # Aufruf des start button
-                    self.stop_all_sounds()
-                    self.start_time = pygame.time.get_ticks() # Start time of main game, used for night day cycle
-                    self.wave_cycle_start_time = pygame.time.get_ticks() # Also start time of game, but used for wave cycle
-                    self.timer_start_time = pygame.time.get_ticks() # Used for timer
-                    self.state = self.main_game
-                    return
+                    self.begin_transition(self.change_to_main_game, duration=1200, prefetch=self.prefetch_main_game())
                 # The window will be closed when the quit button is pressed
                 if self.quit_button_game_over_screen.is_clicked(event):
                     self.play_quit_button_sound() # Aufruf des start button sounds
 
-                    ### delay damit der sound abgespielt wird bevor das fenster schließt
-                    time.sleep(1)
-                    # exit game / start screen
-                    pygame.quit()
-                    sys.exit()
+                    ### fade out, damit der sound abgespielt wird bevor das fenster schließt
+                    self.begin_transition(self.quit_game, duration=1000)
 
             # Drawing
             self.screen.blit(self.game_over_screen_image, (0, 0))
             self.continue_button.draw(self.screen)
             self.quit_button_game_over_screen.draw(self.screen)
             self.display_high_score()
-            pygame.display.update()
+            self.display_leaderboard()
+            self.display_run_statistics()
+            transition_completed = self.update_transition()
+            self.present_scene()
+
+            if transition_completed:
+                return
 
     def main_game(self):
         """
@@ -1297,186 +2241,363 @@ class Game:
         # We need to re-/initialize the behaviour of all game objects, before starting/restarting the game
         self.initialize_behaviour()
 
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                # The QUIT button returns the player to the start screen (windowed mode)
-                if self.quit_button.is_clicked(event):
-                    self.state = self.start_screen
-                    self.screen = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), pygame.NOFRAME)
-                    return
-                
-                """
-                # Not being used right now - START
-
-                # Testing fullscreen toggle
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_f:
-                        self.is_fullscreen = not self.is_fullscreen
-                        if self.is_fullscreen:
-                            self.screen = pygame.display.set_mode((self.ACTUAL_SCREEN_WIDTH, self.ACTUAL_SCREEN_HEIGHT), pygame.FULLSCREEN)
-                            # We change the position of the car, as we draw the background image at a different background position for the fullscreen mode
-                            # The y position of the background image is at "ACTUAL_SCREEN_HEIGHT // 8", so we need to adjust all the cars
-                            self.player_rect.centery += self.ACTUAL_SCREEN_HEIGHT // 8
-                            for enemy in self.enemies:
-                                enemy["rect"].centery += self.ACTUAL_SCREEN_HEIGHT // 8
-                        else:
-                            self.screen = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), pygame.NOFRAME)
-                            self.player_rect.centery -= self.ACTUAL_SCREEN_HEIGHT // 8
-                            for enemy in self.enemies:
-                                enemy["rect"].centery -= self.ACTUAL_SCREEN_HEIGHT // 8
-
-                # Not being used right now - END
-                """
-
-            # Draw remaining lives
-            self.draw_level()
-
-            # We are drawing the current background 2 times.
-            # One time at bg_x and one time at bg_x + self.current_background.get_width())
-            # But we only draw it 2 times, when abs(self.bg_x) + self.ACTUAL_SCREEN_WIDTH is equal or larger than self.current_background.get_width())
-            for x in range(self.bg_x, self.ACTUAL_SCREEN_WIDTH, self.current_background.get_width()):
-                y = self.ACTUAL_SCREEN_HEIGHT // 8
-                self.screen.blit(self.current_background, (x, y))
+        while self.main_game_frame():
+            pass
 
-            # Reset bg_x (x-coordinate of the background) when the background is outside of the screen completely
-            if self.bg_x < - self.current_background.get_width():
-                self.bg_x = 0
+    def main_game_frame(self):
+        """
+        Runs one frame of the main game loop (see main_game()).
 
-            # Move Background
-            self.bg_x -= self.BACKGROUND_SPEED  # Ändere die Geschwindigkeit, wie das Hintergrundbild nach links läuft
+        The frame is split into systems (input, spawning, simulation, collisions, ..., drawing the layers and the HUD),
+        which the frame scheduler runs and times (see create_frame_scheduler()).
 
-            # Moving Player
-            self.player_input_speed_calculation()
-            self.update_player_position()
+        Returns:
+            bool: False, when the main game loop has to end (collision or QUIT button), otherwise True.
 
-            # Drawing player car
-            self.screen.blit(self.player_image, self.player_rect)
+        Author: Florian Goldbach, Christian Gerhold
+        """
+        if not self.frame_scheduler.run():
+            return False
 
-            # Spawning canisters
-            current_time_for_canister_spawn = pygame.time.get_ticks()
-            if current_time_for_canister_spawn - self.last_canister_spawn_time >= self.CANISTER_SPAWN_TIME:  # 8 Sekunden , kann zum Testen verkleinert werden!
-                self.spawn_canister()
-                self.last_canister_spawn_time = current_time_for_canister_spawn
+        # Duration of the frame in milliseconds (used for particles), at most 50 after long frames
+        frame_time = self.clock.tick(120)
+        self.run_statistics.record_frame(frame_time, self.wave, {
+            "cars": len(self.enemies), "bikes": len(self.bikes), "pedestrians": len(self.pedestrians), "canisters": len(self.canisters),
+        })
+        self.frame_time = min(50, frame_time)
 
-            # Drawing, moving, collecting, removing canisters
-            self.handle_canister_behaviour()
+        # The time the frame took, without waiting for the next one, decides the quality level
+        if self.QUALITY_GOVERNOR and self.quality_governor.record(self.clock.get_rawtime()):
+            self.apply_quality_level()
 
-            # Spawing enemy cars
-            current_time_for_car_spawn = pygame.time.get_ticks()
-            if current_time_for_car_spawn - self.last_spawn_time >= self.car_spawn_time:
-                self.spawn_car()
-                self.last_spawn_time = current_time_for_car_spawn
+        return True
 
-            # Moving and drawing enemy cars
-            for enemy in self.enemies:
-                enemy["rect"].centerx -= enemy["speed"]
-                self.screen.blit(enemy["image"], enemy["rect"])
+    def create_frame_scheduler(self):
+        """
+        Registers the systems of a main game frame with the scheduler.
+
+        The systems in their default order (FRAME_SYSTEMS):
+        - input: events, arrow keys and the QUIT button
+        - spawn: canisters, cars, pedestrians and bikes, whenever their spawn time is due
+        - simulate: moves the background, the player and all game objects, waves, difficulty and day/night transition
+        - collide: collecting canisters and collisions with cars, pedestrians and bikes (ends the frame)
+        - cull: removes game objects, that left the screen (cars may respawn)
+        - draw_background, draw_entities, draw_night_lights, draw_particles, draw_canopy: the layers of the frame, bottom to top
+        - compose_hud: renders the timer text - it doesn't depend on the other systems and can run concurrently
+        - draw_hud: QUIT button, timer and quality level on top of everything
+        - present: shows the frame
+        """
+        systems = {
+            "input": self.handle_frame_events,
+            "spawn": self.spawn_game_objects,
+            "simulate": self.simulate_game_objects,
+            "collide": self.handle_collisions,
+            "cull": self.cull_game_objects,
+            "draw_background": self.draw_background,
+            "draw_entities": self.draw_game_objects,
+            "draw_night_lights": self.draw_night_lights,
+            "draw_particles": self.draw_particles,
+            "draw_canopy": self.draw_canopy,
+            "compose_hud": self.compose_hud,
+            "draw_hud": self.draw_hud,
+            "present": self.present,
+        }
+        return SystemScheduler(
+            systems, self.FRAME_SYSTEMS, self.DISABLED_FRAME_SYSTEMS, self.CONCURRENT_FRAME_SYSTEMS, self.FRAME_SYSTEMS_REPORT_FRAMES
+        )
 
-            # Collision detection for enemy cars
-            for enemy in self.enemies:
-                if self.player_rect.colliderect(enemy["rect"]):
-                    self.handle_collision(enemy)
-                    self.is_game_over()
+    def handle_frame_events(self):
+        """
+        Input system - handles the events of the frame.
 
-                    # We have to return, as we want to reset the player and don't want to loose all lives at once.
-                    return
+        Returns:
+            bool: False, when the QUIT button was clicked, otherwise True.
 
-            # Spawning pedestrians
-            current_time_for_pedestrian_spawn = pygame.time.get_ticks()
-            if current_time_for_pedestrian_spawn - self.last_pedestrian_spawn_time >= self.pedestrian_spawn_time:
-                self.spawn_pedestrian()
-                self.last_pedestrian_spawn_time = current_time_for_pedestrian_spawn
+        Author: Florian Goldbach, Christian Gerhold
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            # Arrow keys
+            self.keyboard.handle_event(event)
+            # The QUIT button returns the player to the start screen
+            if self.quit_button.is_clicked(event):
+                self.finish_ghost_run(is_best=False)
+                self.state = self.start_screen
+                self.show_scene()
+                return False
+            
+            """
+            # Not being used right now - START
+
+            # Testing fullscreen toggle
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_f:
+                    self.is_fullscreen = not self.is_fullscreen
+                    if self.is_fullscreen:
+                        self.screen = pygame.display.set_mode((self.ACTUAL_SCREEN_WIDTH, self.ACTUAL_SCREEN_HEIGHT), pygame.FULLSCREEN)
+                        # We change the position of the car, as we draw the background image at a different background position for the fullscreen mode
+                        # The y position of the background image is at "ACTUAL_SCREEN_HEIGHT // 8", so we need to adjust all the cars
+                        self.player_rect.centery += self.ACTUAL_SCREEN_HEIGHT // 8
+                        for enemy in self.enemies:
+                            enemy["rect"].centery += self.ACTUAL_SCREEN_HEIGHT // 8
+                    else:
+                        self.screen = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), pygame.NOFRAME)
+                        self.player_rect.centery -= self.ACTUAL_SCREEN_HEIGHT // 8
+                        for enemy in self.enemies:
+                            enemy["rect"].centery -= self.ACTUAL_SCREEN_HEIGHT // 8
 
-            # Drawing, moving, animating and removing pedestrians
-            self.handle_pedestrian_behaviour()
+            # Not being used right now - END
+            """
 
-            # Collision detection for pedestrians
-            for pedestrian in self.pedestrians:
-                if self.player_rect.colliderect(pedestrian.rect):
+        return True
 
-                    self.handle_collision(pedestrian)
-                    self.play_scream_sound()
-                    self.is_game_over()
+    def spawn_game_objects(self):
+        """
+        Spawn system - spawns canisters, cars, pedestrians and bikes, when their spawn time is due.
 
-                    # We want to return the main_game() loop, after one collision detection,
-                    # to reset the player and not loose all lives.
-                    return
+        Author: Florian Goldbach, Christian Gerhold
+        """
+        # Spawning canisters
+        current_time_for_canister_spawn = pygame.time.get_ticks()
+        if current_time_for_canister_spawn - self.last_canister_spawn_time >= self.CANISTER_SPAWN_TIME:  # 8 Sekunden , kann zum Testen verkleinert werden!
+            self.spawn_canister()
+            self.last_canister_spawn_time = current_time_for_canister_spawn
+
+        # Spawing enemy cars
+        current_time_for_car_spawn = pygame.time.get_ticks()
+        if current_time_for_car_spawn - self.last_spawn_time >= self.car_spawn_time:
+            self.spawn_car()
+            self.last_spawn_time = current_time_for_car_spawn
+
+        # Spawning pedestrians
+        current_time_for_pedestrian_spawn = pygame.time.get_ticks()
+        if current_time_for_pedestrian_spawn - self.last_pedestrian_spawn_time >= self.pedestrian_spawn_time:
+            self.spawn_pedestrian()
+            self.last_pedestrian_spawn_time = current_time_for_pedestrian_spawn
+
+        # Spawning bikes
+        current_time_for_bike_spawn = pygame.time.get_ticks()
+        if current_time_for_bike_spawn - self.last_bike_spawn_time >= self.bike_spawn_time:
+            self.spawn_bike()
+            self.last_bike_spawn_time = current_time_for_bike_spawn
+
+    def simulate_game_objects(self):
+        """
+        Simulation system - moves and animates the background, the player and all game objects.
 
-            # Spawning bikes
-            current_time_for_bike_spawn = pygame.time.get_ticks()
-            if current_time_for_bike_spawn - self.last_bike_spawn_time >= self.bike_spawn_time:
-                self.spawn_bike()
-                self.last_bike_spawn_time = current_time_for_bike_spawn
-            
-            # Drawing, moving, animating and removing bikes and collision detection
-            for bike in self.bikes:
+        Also updates the state of the wave, the particles, the difficulty and the day/night transition.
 
-                if self.player_rect.colliderect(bike.rect):
+        Author: Florian Goldbach, Christian Gerhold
+        """
+        # Move Background
+        self.bg_x -= self.BACKGROUND_SPEED  # Ändere die Geschwindigkeit, wie das Hintergrundbild nach links läuft
+
+        # Baking the chunks of the road coming into view and evicting the ones, that scrolled past the left edge
+        # The tyre marks of an evicted chunk are removed, so its slot of the tyre mark layer is free for a new chunk
+        for index in self.road.update(self.bg_x, self.ACTUAL_SCREEN_WIDTH):
+            slot = index % self.ROAD_RESIDENT_CHUNKS
+            self.tyre_marks.clear(pygame.Rect(slot * self.road.chunk_width, 0, self.road.chunk_width, self.road.height))
+
+        # Moving Player
+        self.player_input_speed_calculation()
+        self.update_player_position()
+        self.leave_tyre_marks()
+        self.update_ghost()
+
+        # Moving canisters
+        for canister in self.canisters:
+            canister.move()
 
-                    self.handle_collision(bike)
-                    self.is_game_over()
+        # Moving enemy cars - they keep their distance to the car in front
+        positions = self.traffic.update()
+        for enemy in self.enemies:
+            enemy["rect"].centerx = positions[enemy["slot"]]
+            self.check_near_miss(enemy)
 
-                    # We want to return the main_game() loop, after one collision detection,
-                    # to reset the player and not loose all lives.
-                    return
+        # Moving and animating pedestrians and bikes
+        for pedestrian in self.pedestrians:
+            pedestrian.animate(self.animation_interval)
+            pedestrian.move()
+        for bike in self.bikes:
+            bike.animate(self.animation_interval)
+            bike.move()
 
-                bike.animate()
-                bike.move()
-                bike.draw(self.screen)
+        # Updating the state of the wave - either the wave is on or not
+        self.update_state_of_wave()
 
-                # Remove bikes that are out of the screen
-                if bike.rect.right < 0:
-                    self.bikes.remove(bike)
+        # Moving particles (explosions and exhaust smoke)
+        self.emit_exhaust_particles(self.frame_time)
+        self.particles.update(self.frame_time)
 
-            # Updating the state of the wave - either the wave is on or not
-            self.update_state_of_wave()
+        self.increase_difficulty()
 
-            # Handle enemy off-screen and spawning
-            # When an enemy car leaves the screen there is a 90% chance it will respawn during wave
-            for enemy in self.enemies:
-                if enemy["rect"].right < 0:
-                    self.enemies.remove(enemy)
+        # Night and day transition
+        self.night_day_transition()
 
-                    # The respawn rate of enemy cars leaving the screen is far less when there is no wave active.
-                    # This gives the player time to breath.
-                    if self.wave:
-                        if random.random() < 0.95:
-                            self.spawn_car()
-                    else:
-                        if random.random() < 0.3:
-                            self.spawn_car()
+    def handle_collisions(self):
+        """
+        Collision system - collects canisters and detects collisions with cars, pedestrians and bikes.
 
-            # We are drawing the trees in the same fashion as the background - 2 times
-            # But after all other elements to create a layered effect
-            for x in range(self.bg_x, self.ACTUAL_SCREEN_WIDTH, self.current_background.get_width()):
-                y = self.ACTUAL_SCREEN_HEIGHT // 8
-                self.screen.blit(self.current_trees, (x, y))
+        Returns:
+            bool: False after a collision (the main game loop restarts or the game is over), otherwise True.
+
+        Author: Florian Goldbach, Christian Gerhold
+        """
+        # Collecting canisters
+        # Iterating over a copy, as canisters are removed from the list
+        for canister in self.canisters[:]:
+            if self.collides_with_player(canister.rect, canister.mask):
+                self.handle_canister_collision(canister)
+
+        # Collision detection for enemy cars
+        for enemy in self.enemies:
+            if self.collides_with_player(enemy["rect"], enemy["mask"]):
+                self.handle_collision(enemy)
+                self.is_game_over()
+
+                # We have to return, as we want to reset the player and don't want to loose all lives at once.
+                return False
+
+        # Collision detection for pedestrians
+        for pedestrian in self.pedestrians:
+            if self.collides_with_player(pedestrian.rect, pedestrian.mask):
+
+                self.handle_collision(pedestrian)
+                self.play_scream_sound()
+                self.is_game_over()
+
+                # We want to return the main_game() loop, after one collision detection,
+                # to reset the player and not loose all lives.
+                return False
+
+        # Collision detection for bikes
+        for bike in self.bikes:
+            if self.collides_with_player(bike.rect, bike.mask):
+
+                self.handle_collision(bike)
+                self.is_game_over()
+
+                # We want to return the main_game() loop, after one collision detection,
+                # to reset the player and not loose all lives.
+                return False
 
-                """ Not in use right now (windowed mode)
-                if self.is_fullscreen:
-                    y = self.ACTUAL_SCREEN_HEIGHT // 8
+        return True
+
+    def cull_game_objects(self):
+        """
+        Culling system - removes game objects, that left the screen on the left.
+
+        Author: Florian Goldbach, Christian Gerhold
+        """
+        # Remove canisters, pedestrians and bikes that are out of the screen
+        self.canisters = [canister for canister in self.canisters if canister.rect.right >= 0]
+        self.pedestrians = [pedestrian for pedestrian in self.pedestrians if pedestrian.rect.right >= 0]
+        self.bikes = [bike for bike in self.bikes if bike.rect.right >= 0]
+
+        # Handle enemy off-screen and spawning
+        # When an enemy car leaves the screen there is a 90% chance it will respawn during wave
+        # Iterating over a copy, as enemies are removed from the list (and new ones are spawned)
+        for enemy in self.enemies[:]:
+            if enemy["rect"].right < 0:
+                self.enemies.remove(enemy)
+                self.traffic.remove(enemy["slot"])
+
+                # The respawn rate of enemy cars leaving the screen is far less when there is no wave active.
+                # This gives the player time to breath.
+                if self.wave:
+                    if random.random() < 0.95:
+                        self.spawn_car()
                 else:
-                    y = 0
-                self.screen.blit(self.current_trees, (x, y))
-                """
+                    if random.random() < 0.3:
+                        self.spawn_car()
+
+    def draw_background(self):
+        """
+        Draws the bottom layer - remaining lives (clears the screen) and the scrolling background with the tyre marks.
+
+        Author: Florian Goldbach
+        """
+        # Draw remaining lives
+        self.draw_level()
+
+        # The background (and the tyre marks scrolling with it) is kept in a cache the size of the screen.
+        # The cache is shifted by the distance the background moved, only the strip becoming visible on the right is drawn
+        # from the chunks of the road (see ScrollingBackground)
+        self.background_cache.draw(self.screen, self.ACTUAL_SCREEN_HEIGHT // 8, self.road, self.tyre_marks, self.bg_x)
+
+    def draw_game_objects(self):
+        """
+        Draws the ghost, the player car, canisters, enemy cars, pedestrians and bikes (in this order).
+
+        Author: Florian Goldbach, Christian Gerhold
+        """
+        # Drawing the ghost of the best run below the player car
+        if self.ghost_position is not None:
+            self.screen.blit(self.ghost_image, self.ghost_position)
 
-            # Drawing and positioning the QUIT-button
-            self.quit_button.draw(self.screen)
-            self.quit_button.move(int(2.5*self.perc_W), self.ACTUAL_SCREEN_HEIGHT // 8 + int(3*self.perc_H))
+        # Drawing player car
+        self.screen.blit(self.player_image, self.player_rect)
 
-            self.increase_difficulty()
+        for canister in self.canisters:
+            canister.draw(self.screen)
+        for enemy in self.enemies:
+            self.screen.blit(enemy["image"], enemy["rect"])
+        for pedestrian in self.pedestrians:
+            pedestrian.draw(self.screen)
+        for bike in self.bikes:
+            bike.draw(self.screen)
 
-            # Night and day transition
-            self.night_day_transition()
+    def draw_particles(self):
+        # Particles (explosions and exhaust smoke) are drawn underneath the trees
+        self.particles.draw(self.screen)
 
-            # Displaying timer
-            self.display_timer()
+    def draw_canopy(self, surface=None, opaque_only=None):
+        """
+        Draws the tree canopy above everything else (apart from the HUD).
 
-            pygame.display.update()
-            self.clock.tick(120) 
+        Args:
+            surface (pygame.Surface): Surface to draw on (the screen, if None).
+            opaque_only (bool): Draw only the opaque tiles (the current quality level decides, if None).
+
+        Author: Florian Goldbach
+        """
+        surface = self.screen if surface is None else surface
+        opaque_only = self.canopy_opaque_only if opaque_only is None else opaque_only
+
+        # We are drawing the trees in the same fashion as the background - the columns of each chunk's segment
+        # But after all other elements to create a layered effect
+        # Only the visible tiles of the canopy layer, that actually contain tree tops, are drawn
+        y = self.ACTUAL_SCREEN_HEIGHT // 8
+        chunk_columns = self.road.chunk_width // self.current_canopy.tile_size
+        for x, segment in self.road.get_chunks(self.bg_x, 0, self.ACTUAL_SCREEN_WIDTH):
+            self.current_canopy.draw(
+                surface, (x - segment * self.road.chunk_width, y), opaque_only,
+                columns=(segment * chunk_columns, (segment + 1) * chunk_columns)
+            )
+
+            """ Not in use right now (windowed mode)
+            if self.is_fullscreen:
+                y = self.ACTUAL_SCREEN_HEIGHT // 8
+            else:
+                y = 0
+            self.current_canopy.draw(self.screen, (x, y))
+            """
+
+    def draw_hud(self):
+        """
+        Draws the QUIT button, the timer and the quality level.
+
+        Author: Florian Goldbach
+        """
+        # Drawing and positioning the QUIT-button
+        self.quit_button.draw(self.screen)
+        self.quit_button.move(int(2.5*self.perc_W), self.ACTUAL_SCREEN_HEIGHT // 8 + int(3*self.perc_H))
+
+        # Displaying timer
+        self.display_timer()
+        self.display_quality_level()
 
     def run(self):
         """
@@ -1506,6 +2627,7 @@ class Pedestrian:
         y (int): initial y-coordinate of the pedestrian's position.
         speed (int): The speed at which the pedestrian will move.
         pedestrian_animation_images (list): A list of pygame.Surface objects representing the animation frames (will be 3 images).
+        pedestrian_animation_masks (list): The pixel masks of the animation frames (pygame.mask.Mask), for collisions.
 
     Attributes:
         x (int): x-coordinate of the pedestrian's position.
@@ -1514,6 +2636,7 @@ class Pedestrian:
         images (list): A list of images for the pedestrian's animation.
         current_image (int): The index of the current image in the animation sequence.
         image (pygame.Surface): The current image of the pedestrian.
+        mask (pygame.mask.Mask): The pixel mask of the current image.
         rect (pygame.Rect): The rectangle area of the pedestrian (position and size).
         animation_time (int): Timestamp of the last animation frame update.
 
@@ -1525,21 +2648,24 @@ class Pedestrian:
     Author:
         Florian Goldbach
     """
-    def __init__(self, x, y, speed, pedestrian_animation_images):
+    def __init__(self, x, y, speed, pedestrian_animation_images, pedestrian_animation_masks):
         self.x = x
         self.y = y
         self.speed = speed
         self.images = pedestrian_animation_images
+        self.masks = pedestrian_animation_masks
         self.current_image = 0
         self.image = self.images[self.current_image]
+        self.mask = self.masks[self.current_image]
         self.rect = self.image.get_rect(topleft=(self.x, self.y))
         self.animation_time = pygame.time.get_ticks()
 
-    def animate(self):
-        # Animation speed is 200ms
-        if pygame.time.get_ticks() - self.animation_time > 200:  
+    def animate(self, interval=200):
+        # Animation speed is 200ms (longer at reduced quality)
+        if pygame.time.get_ticks() - self.animation_time > interval:
             self.current_image = (self.current_image + 1) % len(self.images)
             self.image = self.images[self.current_image]
+            self.mask = self.masks[self.current_image]
             self.animation_time = pygame.time.get_ticks()
 
     def move(self):
@@ -1559,21 +2685,24 @@ class Bike:
 
     Author: Florian Goldbach
     """
-    def __init__(self, x, y, speed, bike_animation_images):
+    def __init__(self, x, y, speed, bike_animation_images, bike_animation_masks):
         self.x = x
         self.y = y
         self.speed = speed
         self.images = bike_animation_images
+        self.masks = bike_animation_masks
         self.current_image = 0  # Start at the first frame
         self.image = self.images[self.current_image]
+        self.mask = self.masks[self.current_image]
         self.rect = self.image.get_rect(topleft=(self.x, self.y))
         self.animation_time = pygame.time.get_ticks()
 
-    def animate(self):
+    def animate(self, interval=200):
         # Change to the next frame every 200ms as an example
-        if pygame.time.get_ticks() - self.animation_time > 200:
+        if pygame.time.get_ticks() - self.animation_time > interval:
             self.current_image = (self.current_image + 1) % len(self.images)
             self.image = self.images[self.current_image]
+            self.mask = self.masks[self.current_image]
             self.animation_time = pygame.time.get_ticks()
             # self.rect.size = self.image.get_size()
 
@@ -1597,12 +2726,14 @@ class Canister:
         y (int): initial y-coordinate of the canister's position.
         speed (int): The speed at which the canister will move.
         image (pygame.Surface): A pygame.Surface object - image of the canister.
+        mask (pygame.mask.Mask): The pixel mask of the image, for collisions.
 
     Attributes:
         x (int): x-coordinate of the canister's position.
         y (int): y-coordinate of the canister's position.
         speed (int): The speed at which the canister will move.
         image (pygame.Surface): A pygame.Surface object - image of the canister.
+        mask (pygame.mask.Mask): The pixel mask of the image.
         rect (pygame.Rect): The rectangle area of the canister.
 
     Methods:
@@ -1612,11 +2743,12 @@ class Canister:
     Author:
         Florian Goldbach, Christian Gerhold
     """
-    def __init__(self, x, y, speed, image):
+    def __init__(self, x, y, speed, image, mask):
         self.x = x
         self.y = y
         self.speed = speed
         self.image = image
+        self.mask = mask
         self.rect = self.image.get_rect(topleft=(self.x, self.y))
 
     def move(self):
@@ -1650,10 +2782,14 @@ class Button:
         current_color (str): The current color state of the button, either 'default' or 'hover'.
         text_img (pygame.Surface): The rendered image of the text.
         rect (pygame.Rect): The rectangle of the button (position and size).
+        mouse_scale (tuple): Scales the mouse position to the coordinates of the surface the button is drawn on
+            (used, when the game is drawn at a lower render resolution).
+        mouse_offset (tuple): Top left corner of the surface the button is drawn on, on the display (scenes are centred).
 
     Methods:
         draw(surface): Draws the button on the specified surface.
         is_hovered(pos): Checks if the given position (mouse position) is on top of the button.
+        get_mouse_pos(): Returns the mouse position, moved by mouse_offset and scaled by mouse_scale.
         move(new_x, new_y): Moves the button to a new position.
         is_clicked(event): Determines if the button is clicked based on a given Pygame event.
     
@@ -1667,31 +2803,1893 @@ class Button:
         self.current_color = 'default'
         self.text_img = self.font.render(self.text, True, self.colors[self.current_color])
         self.rect = self.text_img.get_rect(center=(x, y))
+        self.mouse_scale = (1, 1)
+        self.mouse_offset = (0, 0)
 
     def draw(self, surface):
         # Update color based on hover state
-        self.current_color = 'hover' if self.is_hovered(pygame.mouse.get_pos()) else 'default'
+        self.current_color = 'hover' if self.is_hovered(self.get_mouse_pos()) else 'default'
         self.text_img = self.font.render(self.text, True, self.colors[self.current_color])
         surface.blit(self.text_img, self.rect)
 
     def is_hovered(self, pos):
         return self.rect.collidepoint(pos)
 
+    def get_mouse_pos(self):
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        return (
+            int((mouse_x - self.mouse_offset[0]) * self.mouse_scale[0]),
+            int((mouse_y - self.mouse_offset[1]) * self.mouse_scale[1]),
+        )
+
     def move(self, new_x, new_y):
         self.rect.center = (new_x, new_y)
 
     def is_clicked(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.is_hovered(pygame.mouse.get_pos()):
+            if self.is_hovered(self.get_mouse_pos()):
+                return True
+        return False
+
+
+class KeyboardInput:
+    """
+    Class for the keyboard state of the player's controls, driven by key events.
+
+    Instead of polling the keyboard once per frame, every KEYDOWN and KEYUP event is applied as it arrives.
+    A key that was pressed since the last tick counts as pressed for that tick, even if it was
+    released again before the tick - short taps are not lost, if a frame takes longer.
+
+    Args:
+        keys (iterable): The keys to track (e.g. pygame.K_UP).
+        latency_probe (bool): Whether to measure the time from queued input events to the frames showing their effect.
+
+    Attributes:
+        held (set): Keys, that are held down.
+        tapped (set): Keys, that were pressed since the last tick.
+        latency_probe (InputLatencyProbe): The latency probe, or None if it is disabled.
+
+    Methods:
+        handle_event(event): Applies a key event (probe events are passed to the latency probe).
+        sync(): Reads the held keys from the keyboard (e.g. after key events were handled elsewhere).
+        is_pressed(key): Returns whether the key is pressed in this tick.
+        end_tick(): Forgets the taps, once a tick has used them.
+    """
+    def __init__(self, keys, latency_probe=False):
+        self.keys = set(keys)
+        self.held = set()
+        self.tapped = set()
+        self.latency_probe = InputLatencyProbe() if latency_probe else None
+
+    def handle_event(self, event):
+        # Probe events take the same way through the event queue as key events
+        if event.type == InputLatencyProbe.EVENT and self.latency_probe is not None:
+            self.latency_probe.handle_event(event)
+            return
+        if event.type not in (pygame.KEYDOWN, pygame.KEYUP) or event.key not in self.keys:
+            return
+        if event.type == pygame.KEYDOWN:
+            self.held.add(event.key)
+            self.tapped.add(event.key)
+        else:
+            self.held.discard(event.key)
+
+    def sync(self):
+        pressed = pygame.key.get_pressed()
+        self.held = {key for key in self.keys if pressed[key]}
+        self.tapped.clear()
+
+    def is_pressed(self, key):
+        return key in self.held or key in self.tapped
+
+    def end_tick(self):
+        self.tapped.clear()
+
+
+class InputLatencyProbe:
+    """
+    Class for measuring the time from input events being queued to the frame showing their effect.
+
+    Pygame events carry no timestamp - timing key events, when they are handled, would miss the time
+    they waited in the event queue (up to a whole frame). Instead, a background thread posts probe events
+    at random intervals (like key presses), stamped with the time they are queued (pygame.event.post() is thread-safe).
+    They are handled with the key events (see KeyboardInput.handle_event()) and their latency is taken,
+    when the next frame is shown on the screen. After every report_interval measurements, the percentiles are printed.
+
+    Args:
+        report_interval (int): Number of measurements per report.
+        interval_ms (tuple): Shortest and longest time between two probe events (milliseconds).
+
+    Methods:
+        handle_event(event): Notes a probe event, that was taken from the queue.
+        frame_presented(): Measures the latency of all probe events noted since the last frame.
+        get_percentiles(): Returns the 50th, 90th and 99th percentile of the measured latencies (milliseconds).
+    """
+    EVENT = pygame.event.custom_type()
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, report_interval=100, interval_ms=(50, 250)):
+        self.report_interval = report_interval
+        self.interval_ms = interval_ms
+        self.pending = []
+        self.samples = []
+
+        self.thread = threading.Thread(target=self.post_events, daemon=True)
+        self.thread.start()
+
+    def post_events(self):
+        while True:
+            time.sleep(random.uniform(*self.interval_ms) / 1000)
+            try:
+                pygame.event.post(pygame.event.Event(self.EVENT, queued=time.perf_counter()))
+            except pygame.error:
+                # Pygame was shut down
+                return
+
+    def handle_event(self, event):
+        self.pending.append(event.queued)
+
+    def frame_presented(self):
+        if not self.pending:
+            return
+        now = time.perf_counter()
+        self.samples.extend((now - queued) * 1000 for queued in self.pending)
+        self.pending.clear()
+        if len(self.samples) >= self.report_interval:
+            print(self.get_report())
+            self.samples.clear()
+
+    def get_percentiles(self):
+        return np.percentile(self.samples, self.PERCENTILES) if self.samples else None
+
+    def get_report(self):
+        percentiles = self.get_percentiles()
+        if percentiles is None:
+            return "Input latency: no events"
+        values = ", ".join(f"p{p} {value:.1f} ms" for p, value in zip(self.PERCENTILES, percentiles))
+        return f"Input latency ({len(self.samples)} events): {values}"
+
+
+class HighScoreStore:
+    """
+    Class for the high scores of this machine, kept across sessions.
+
+    Every finished run is appended to a score log, which is never read as a whole on launch.
+    The best scores are kept in a small index file, which is rewritten (atomically) after each run.
+    It also stores how many log records it covers - records appended after that (e.g. if the game was closed,
+    before the index was written) are read from the end of the log and merged in.
+    When the log grows too large, it is compacted to the best and the most recent records.
+
+    Format (little endian):
+        log:     magic (6 bytes), version (uint16), then one record per run
+        index:   magic (6 bytes), version (uint16), covered log records (uint32), number of entries (uint32),
+                 then the best records, best first
+        record:  unix timestamp (int64), survived time in milliseconds (uint32)
+
+    Args:
+        directory (str): Directory of the score files (created if missing).
+        top_count (int): Number of best scores kept in the index.
+        max_log_records (int): Number of log records, after which the log is compacted.
+        keep_recent (int): Number of most recent records, that are kept when compacting.
+
+    Attributes:
+        best (list): The best records (score, timestamp), best first.
+        log_records (int): Number of records in the log.
+
+    Methods:
+        add(score, timestamp): Adds the score of a finished run, returns its rank (or None if it is not in the index).
+        top(count): Returns the best count records.
+        compact(): Rewrites the log with the best and the most recent records only.
+    """
+    LOG_MAGIC = b"HFLOG\0"
+    INDEX_MAGIC = b"HFTOP\0"
+    VERSION = 1
+    LOG_HEADER = struct.Struct("<6sH")
+    INDEX_HEADER = struct.Struct("<6sHII")
+    RECORD = struct.Struct("<qI")
+
+    LOG_FILE = "scores.log"
+    INDEX_FILE = "scores.idx"
+
+    def __init__(self, directory, top_count=10, max_log_records=5000, keep_recent=100):
+        self.directory = directory
+        self.top_count = top_count
+        self.max_log_records = max_log_records
+        self.keep_recent = keep_recent
+        self.log_path = os.path.join(directory, self.LOG_FILE)
+        self.index_path = os.path.join(directory, self.INDEX_FILE)
+        self.best = []
+        self.log_records = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.create_log_if_missing()
+        self.log_records = self.count_log_records()
+
+        covered = self.read_index()
+        if covered > self.log_records:
+            # Index is newer than the log (e.g. interrupted compaction) - rebuild it from the whole log
+            self.best = []
+            covered = 0
+        if covered < self.log_records:
+            self.merge(self.read_log(covered))
+            self.write_index()
+
+    def create_log_if_missing(self):
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) >= self.LOG_HEADER.size:
+            return
+        with open(self.log_path, "wb") as log:
+            log.write(self.LOG_HEADER.pack(self.LOG_MAGIC, self.VERSION))
+
+    def count_log_records(self):
+        record_count = (os.path.getsize(self.log_path) - self.LOG_HEADER.size) // self.RECORD.size
+        # An incomplete record at the end (game closed while writing) is cut off, so new records are appended aligned
+        with open(self.log_path, "r+b") as log:
+            log.truncate(self.LOG_HEADER.size + record_count * self.RECORD.size)
+        return record_count
+
+    def read_index(self):
+        """Reads the best records from the index and returns the number of log records it covers (0 if it is missing or invalid)."""
+        try:
+            with open(self.index_path, "rb") as index:
+                data = index.read()
+            magic, version, covered, entry_count = self.INDEX_HEADER.unpack_from(data, 0)
+            if magic != self.INDEX_MAGIC or version != self.VERSION:
+                return 0
+            self.best = [
+                (score, timestamp)
+                for timestamp, score in self.RECORD.iter_unpack(
+                    data[self.INDEX_HEADER.size:self.INDEX_HEADER.size + entry_count * self.RECORD.size]
+                )
+            ]
+            return covered
+        except (OSError, struct.error):
+            return 0
+
+    def read_log(self, start=0):
+        """Returns the log records from record number start on, as (score, timestamp)."""
+        with open(self.log_path, "rb") as log:
+            magic, version = self.LOG_HEADER.unpack(log.read(self.LOG_HEADER.size))
+            if magic != self.LOG_MAGIC or version != self.VERSION:
+                raise ValueError(f"{self.log_path} is not a score log (version {self.VERSION})")
+            log.seek(self.LOG_HEADER.size + start * self.RECORD.size)
+            data = log.read((self.log_records - start) * self.RECORD.size)
+        return [(score, timestamp) for timestamp, score in self.RECORD.iter_unpack(data)]
+
+    def write_index(self):
+        data = bytearray(self.INDEX_HEADER.pack(self.INDEX_MAGIC, self.VERSION, self.log_records, len(self.best)))
+        for score, timestamp in self.best:
+            data += self.RECORD.pack(timestamp, score)
+        self.replace_file(self.index_path, data)
+
+    @staticmethod
+    def replace_file(path, data):
+        # Written to a temporary file first, so a crash never leaves a half written file behind
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def sort_key(record):
+        # Longest time first, earlier runs first on equal times
+        score, timestamp = record
+        return -score, timestamp
+
+    def merge(self, records):
+        self.best = sorted(self.best + records, key=self.sort_key)[:self.top_count]
+
+    def add(self, score, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        record = (int(score), int(timestamp))
+
+        with open(self.log_path, "ab") as log:
+            log.write(self.RECORD.pack(record[1], record[0]))
+        self.log_records += 1
+
+        self.merge([record])
+        self.write_index()
+
+        if self.log_records > self.max_log_records:
+            self.compact()
+
+        return self.best.index(record) if record in self.best else None
+
+    def top(self, count=None):
+        return self.best[:count]
+
+    def compact(self):
+        records = self.read_log()
+        kept = set(self.best)
+        kept.update(records[-self.keep_recent:])
+        # Keeps the order of the log (oldest first)
+        compacted = [record for record in records if record in kept]
+
+        data = bytearray(self.LOG_HEADER.pack(self.LOG_MAGIC, self.VERSION))
+        for score, timestamp in compacted:
+            data += self.RECORD.pack(timestamp, score)
+        self.replace_file(self.log_path, data)
+
+        self.log_records = len(compacted)
+        self.write_index()
+
+
+class RunStatistics:
+    """
+    Class for the statistics of a run, kept as running aggregates.
+
+    No events are stored - every counter, sum and maximum has a fixed size, however long the run is.
+    Frame time percentiles come from a histogram with fixed bins (a sketch): each frame increments one bin,
+    the percentiles are read from the cumulative counts.
+
+    Args:
+        bin_ms (float): Width of the frame time bins (milliseconds).
+        max_frame_ms (float): Frame times above this land in the last bin.
+
+    Attributes:
+        collisions (dict): Number of collisions by kind of enemy ("car", "bike", "pedestrian").
+        canisters_collected (int): Number of collected canisters.
+        near_misses (int): Number of cars, that passed the player closely without a collision.
+        wave_time (float): Time spent in waves (milliseconds).
+        peak_counts (dict): Highest number of cars, bikes, pedestrians and canisters on the screen at the same time.
+        frames (int): Number of frames.
+
+    Methods:
+        reset(): Starts the statistics of a new run.
+        record_collision(kind): Counts a collision.
+        record_frame(frame_time, in_wave, counts): Adds a frame (its duration, whether a wave is on, the numbers of game objects).
+        get_frame_time_percentile(percentile): Returns a frame time percentile (milliseconds, upper edge of its bin).
+        to_dict(): Returns all aggregates (for display and export).
+        export(path): Writes the aggregates to a JSON file.
+    """
+    COLLISION_KINDS = ("car", "bike", "pedestrian")
+    COUNTED_OBJECTS = ("cars", "bikes", "pedestrians", "canisters")
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, bin_ms=0.25, max_frame_ms=100):
+        self.bin_ms = bin_ms
+        self.frame_time_bins = np.zeros(int(max_frame_ms / bin_ms) + 1, dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self.collisions = dict.fromkeys(self.COLLISION_KINDS, 0)
+        self.canisters_collected = 0
+        self.near_misses = 0
+        self.wave_time = 0.0
+        self.peak_counts = dict.fromkeys(self.COUNTED_OBJECTS, 0)
+        self.frames = 0
+        self.frame_time_bins[:] = 0
+
+    def record_collision(self, kind):
+        self.collisions[kind] = self.collisions.get(kind, 0) + 1
+
+    def record_frame(self, frame_time, in_wave, counts):
+        self.frames += 1
+        if in_wave:
+            self.wave_time += frame_time
+        self.frame_time_bins[min(int(frame_time / self.bin_ms), len(self.frame_time_bins) - 1)] += 1
+        for name, count in counts.items():
+            if count > self.peak_counts[name]:
+                self.peak_counts[name] = count
+
+    def get_frame_time_percentile(self, percentile):
+        if self.frames == 0:
+            return None
+        cumulative_counts = np.cumsum(self.frame_time_bins)
+        bin_index = int(np.searchsorted(cumulative_counts, self.frames * percentile / 100))
+        return (bin_index + 1) * self.bin_ms
+
+    def to_dict(self):
+        return {
+            "collisions": dict(self.collisions),
+            "canisters_collected": self.canisters_collected,
+            "near_misses": self.near_misses,
+            "wave_time_ms": int(self.wave_time),
+            "peak_counts": dict(self.peak_counts),
+            "frames": self.frames,
+            "frame_time_ms": {f"p{p}": self.get_frame_time_percentile(p) for p in self.PERCENTILES},
+        }
+
+    def export(self, path):
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+
+class GhostRecorder:
+    """
+    Class for recording the player's position of a run into a ghost file, while it is played.
+
+    Each tick only the change of the position is written, as two zigzag-encoded varints (see GhostReplay) -
+    a tick, in which the player moves less than 64 pixels in both directions, takes 2 bytes.
+    The encoded ticks are collected in a small buffer, which is written to the file when it is full.
+
+    Args:
+        path (str): Path of the ghost file (overwritten).
+        width (int): Width of the screen the positions are recorded on.
+        height (int): Height of the screen the positions are recorded on.
+
+    Methods:
+        record(x, y): Records the position of one tick.
+        close(): Writes the rest of the buffer and closes the file.
+    """
+    BUFFER_SIZE = 4096
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(GhostReplay.HEADER.pack(GhostReplay.MAGIC, GhostReplay.VERSION, width, height))
+        self.buffer = bytearray()
+        self.last_x = 0
+        self.last_y = 0
+
+    @staticmethod
+    def encode(value, buffer):
+        # Zigzag: small negative and positive values both become small unsigned values (0, -1, 1, -2 -> 0, 1, 2, 3)
+        value = (value << 1) ^ (value >> 63)
+        while value >= 0x80:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buffer.append(value)
+
+    def record(self, x, y):
+        self.encode(x - self.last_x, self.buffer)
+        self.encode(y - self.last_y, self.buffer)
+        self.last_x = x
+        self.last_y = y
+        if len(self.buffer) >= self.BUFFER_SIZE:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+
+    def close(self):
+        self.file.write(self.buffer)
+        self.buffer.clear()
+        self.file.close()
+
+
+class FrameCapture:
+    """
+    Class for capturing the shown frames into a file, without making the game wait for the disk.
+
+    A ring of frame buffers is allocated up front. After a frame is shown, its pixels are copied into a free buffer,
+    which is handed to a background thread. The thread compresses the frame (zlib releases the GIL),
+    writes it and hands the buffer back. If no buffer is free, the writer has fallen behind - the frame is skipped
+    and only every second (fourth, ...) frame is captured from then on. Once the writer has caught up again,
+    more frames are captured. The game thread never waits for the writer.
+
+    Format (little endian):
+        header:  magic (6 bytes), version (uint16), red, green, blue and alpha mask of the pixels (uint32 each),
+                 compression (uint8, 0 raw, otherwise zlib level)
+        frame:   time (int64, milliseconds), width (uint16), height (uint16), length of the pixel data (uint32),
+                 pixel data (height rows of width 32 bit pixels, compressed unless compression is 0)
+
+    Args:
+        path (str): Path of the capture file (overwritten).
+        surface (pygame.Surface): The display - only 32 bit formats are supported.
+        buffers (int): Number of frame buffers.
+        compression (int): zlib level (0 writes raw frames).
+
+    Attributes:
+        frames_captured (int): Frames handed to the writer.
+        frames_skipped (int): Frames skipped, because the writer fell behind (or by the decimation).
+        decimation (int): Only every decimation-th frame is captured.
+
+    Methods:
+        capture(surface, time_ms): Copies the surface into a free buffer for the writer (or skips the frame).
+        close(): Writes the waiting frames and closes the file.
+        read(path): Yields (time_ms, width, height, pixels) of all frames of a capture file (pixels as bytes).
+    """
+    MAGIC = b"HFCAP1"
+    VERSION = 1
+    HEADER = struct.Struct("<6sH4IB")
+    FRAME = struct.Struct("<qHHI")
+    MAX_DECIMATION = 8
+    # Captures in a row, after which the writer counts as caught up (the decimation is halved)
+    CAUGHT_UP_CAPTURES = 60
+
+    def __init__(self, path, surface, buffers, compression):
+        if surface.get_bitsize() != 32:
+            raise ValueError(f"{surface.get_bitsize()} bit displays are not supported")
+
+        self.compression = compression
+        self.file = open(path, "wb")
+        self.file.write(self.HEADER.pack(self.MAGIC, self.VERSION, *surface.get_masks(), compression))
+
+        # Buffers in the same layout as the surface pixels (rows of pixels), so copying them is a row by row memcpy
+        self.free_buffers = queue.Queue()
+        for _ in range(buffers):
+            self.free_buffers.put(self.allocate(surface.get_size()))
+        self.frames = queue.Queue()
+
+        self.frames_captured = 0
+        self.frames_skipped = 0
+        self.frame_number = 0
+        self.decimation = 1
+        self.caught_up = 0
+
+        self.thread = threading.Thread(target=self.write_all, daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def allocate(size):
+        width, height = size
+        return np.empty((height, width), np.uint32).T
+
+    def capture(self, surface, time_ms):
+        self.frame_number += 1
+        if self.frame_number % self.decimation or self.file.closed:
+            self.frames_skipped += 1
+            return
+
+        try:
+            buffer = self.free_buffers.get_nowait()
+        except queue.Empty:
+            # The writer has fallen behind - capturing fewer frames
+            self.frames_skipped += 1
+            self.decimation = min(self.MAX_DECIMATION, self.decimation * 2)
+            self.caught_up = 0
+            return
+
+        # The display mode changed - the buffer is replaced (only allocates after a mode change)
+        if buffer.shape != surface.get_size():
+            buffer = self.allocate(surface.get_size())
+        pixels = pygame.surfarray.pixels2d(surface)
+        np.copyto(buffer, pixels)
+        del pixels  # Unlocks the surface
+        self.frames.put((time_ms, buffer))
+        self.frames_captured += 1
+
+        # Only this frame is waiting - the writer keeps up
+        if self.decimation > 1 and self.frames.qsize() <= 1:
+            self.caught_up += 1
+            if self.caught_up >= self.CAUGHT_UP_CAPTURES:
+                self.decimation //= 2
+                self.caught_up = 0
+
+    def write_all(self):
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                return
+            time_ms, buffer = frame
+            # The transposed buffer is the pixel rows in memory order
+            pixels = buffer.T
+            data = zlib.compress(pixels, self.compression) if self.compression else pixels.tobytes()
+            width, height = buffer.shape
+            self.file.write(self.FRAME.pack(time_ms, width, height, len(data)))
+            self.file.write(data)
+            self.free_buffers.put(buffer)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.frames.put(None)
+        self.thread.join()
+        self.file.close()
+        print(f"Frame capture: {self.frames_captured} frames captured, {self.frames_skipped} skipped")
+
+    @classmethod
+    def read(cls, path):
+        with open(path, "rb") as file:
+            magic, version, *masks, compression = cls.HEADER.unpack(file.read(cls.HEADER.size))
+            if magic != cls.MAGIC or version != cls.VERSION:
+                raise ValueError(f"{path} is not a frame capture")
+            while True:
+                frame_header = file.read(cls.FRAME.size)
+                if len(frame_header) < cls.FRAME.size:
+                    return
+                time_ms, width, height, length = cls.FRAME.unpack(frame_header)
+                data = file.read(length)
+                yield time_ms, width, height, zlib.decompress(data) if compression else data
+
+
+class GhostReplay:
+    """
+    Class for replaying a ghost file, streamed from disk while the game is played.
+
+    Only a small part of the file is held in memory - the next chunk is read, when the current one is used up.
+    Positions are scaled, if the ghost was recorded on a screen of a different size.
+
+    Format (little endian):
+        header:  magic (6 bytes), version (uint16), screen width (uint16), screen height (uint16)
+        ticks:   change of x and y since the last tick, each as a zigzag-encoded varint (7 bits per byte,
+                 the highest bit is set on all bytes but the last)
+
+    Args:
+        path (str): Path of the ghost file.
+        width (int): Width of the screen the ghost is drawn on.
+        height (int): Height of the screen the ghost is drawn on.
+
+    Methods:
+        next_position(): Returns the position of the next tick, or None when the ghost has finished.
+        close(): Closes the file.
+    """
+    MAGIC = b"HFGST\0"
+    VERSION = 1
+    HEADER = struct.Struct("<6sHHH")
+    CHUNK_SIZE = 4096
+
+    def __init__(self, path, width, height):
+        self.file = open(path, "rb")
+        magic, version, recorded_width, recorded_height = self.HEADER.unpack(self.file.read(self.HEADER.size))
+        if magic != self.MAGIC or version != self.VERSION:
+            self.file.close()
+            raise ValueError(f"{path} is not a ghost file (version {self.VERSION})")
+        self.scale_x = width / recorded_width
+        self.scale_y = height / recorded_height
+        self.chunk = b""
+        self.position = 0
+        self.x = 0
+        self.y = 0
+
+    def read_byte(self):
+        if self.position >= len(self.chunk):
+            self.chunk = self.file.read(self.CHUNK_SIZE)
+            self.position = 0
+            if not self.chunk:
+                return None
+        byte = self.chunk[self.position]
+        self.position += 1
+        return byte
+
+    def decode(self):
+        value = 0
+        shift = 0
+        while True:
+            byte = self.read_byte()
+            if byte is None:
+                return None
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return (value >> 1) ^ -(value & 1)
+            shift += 7
+
+    def next_position(self):
+        if self.file.closed:
+            return None
+        dx = self.decode()
+        dy = self.decode()
+        if dx is None or dy is None:
+            self.close()
+            return None
+        self.x += dx
+        self.y += dy
+        return int(self.x * self.scale_x), int(self.y * self.scale_y)
+
+    def close(self):
+        self.file.close()
+
+
+class AssetStreamer:
+    """
+    Class for loading resources in the background.
+
+    A background thread decodes the files (images and sounds) one after another.
+    Converting has to happen on the main thread (convert() needs the display),
+    so the screen loop calls pump() every frame, which prepares decoded files for a limited time.
+    Work, that doesn't need the display, can be done on the background thread by a job's process function.
+
+    Args:
+        jobs (list): (relative_path, prepare) or (relative_path, prepare, process) tuples.
+            process(decoded) is called on the background thread, prepare() on the main thread (with the processed file).
+        on_complete (callable, optional): Called on the main thread, once all jobs are prepared.
+
+    Attributes:
+        jobs_total (int): Number of jobs.
+        jobs_done (int): Number of prepared jobs.
+        decoded (queue.Queue): Decoded files, waiting to be prepared.
+
+    Methods:
+        pump(budget_ms): Prepares decoded files for at most budget_ms milliseconds.
+        wait(): Prepares all files, waiting for the background thread if necessary.
+        is_done(): True if all jobs are prepared.
+        get_progress(): Fraction of prepared jobs (0 to 1).
+    """
+    SOUND_FILE_EXTENSIONS = (".wav", ".mp3", ".ogg")
+
+    def __init__(self, jobs, on_complete=None):
+        self.jobs_total = len(jobs)
+        self.jobs_done = 0
+        self.on_complete = on_complete
+        self.decoded = queue.Queue()
+
+        self.thread = threading.Thread(target=self.decode_all, args=(jobs,), daemon=True)
+        self.thread.start()
+
+    def decode_all(self, jobs):
+        for relative_path, prepare, *process in jobs:
+            try:
+                decoded = self.decode(relative_path)
+                if process:
+                    decoded = process[0](decoded)
+            except Exception as error:
+                # The error is raised on the main thread
+                decoded = error
+            self.decoded.put((prepare, decoded))
+
+    def decode(self, relative_path):
+        if relative_path.lower().endswith(self.SOUND_FILE_EXTENSIONS):
+            return pygame.mixer.Sound(resource_path(relative_path))
+        return pygame.image.load(resource_path(relative_path))
+
+    def prepare(self, prepare, decoded):
+        if isinstance(decoded, Exception):
+            raise decoded
+
+        prepare(decoded)
+        self.jobs_done += 1
+
+        if self.is_done() and self.on_complete is not None:
+            self.on_complete()
+
+    def pump(self, budget_ms):
+        deadline = time.perf_counter() + budget_ms / 1000
+        while not self.is_done() and time.perf_counter() < deadline:
+            try:
+                self.prepare(*self.decoded.get_nowait())
+            except queue.Empty:
+                break
+        return self.is_done()
+
+    def wait(self):
+        while not self.is_done():
+            self.prepare(*self.decoded.get())
+
+    def is_done(self):
+        return self.jobs_done == self.jobs_total
+
+    def get_progress(self):
+        return self.jobs_done / self.jobs_total
+
+
+class NightLighting:
+    """
+    Class for the headlights and taillights of the cars at night.
+
+    The light cone (in front of the car) and the taillight glow (behind the car) are rendered once 
+    for the car size and added onto the screen (additive blending), which brightens whatever is below them.
+    For each intensity level, the sprites are darkened once and cached, 
+    so drawing the lights of one car is always two blits.
+
+    Args:
+        car_size (tuple): Width and height of the cars (pixels).
+        levels (int): Number of intensity levels (level 0 is off, level - 1 is full brightness).
+        max_intensity (float): Brightness at full night (0 to 1).
+
+    Attributes:
+        sprites (list): The light cone and the taillight glow at full brightness (opaque, black means no light).
+        cache (dict): Maps intensity levels to the darkened sprites.
+
+    Methods:
+        set_sprites(sprites): Replaces the sprites (e.g. converted to a new display format) and clears the cache.
+        draw(screen, car_rect, level, headlights): Draws the lights of the car at car_rect (headlights only if headlights is True).
+    """
+    def __init__(self, car_size, levels, max_intensity):
+        self.levels = levels
+        self.max_intensity = max_intensity
+        self.sprites = [self.create_cone(car_size), self.create_taillights(car_size)]
+        self.cache = {}
+
+    @staticmethod
+    def create_cone(car_size):
+        car_width, car_height = car_size
+        length, height = car_width * 3, int(car_height * 2.2)
+        cone = pygame.Surface((length, height))
+        cone.fill((0, 0, 0))
+
+        # The cone gets wider and darker with the distance to the car
+        for x in range(length):
+            distance = x / length
+            brightness = (1 - distance) ** 1.5
+            half_height = int(car_height * 0.3 + (height / 2 - car_height * 0.3) * distance)
+            for edge in range(3):
+                # Softer at the edges of the cone
+                edge_brightness = brightness * (edge + 1) / 3
+                color = (int(255 * edge_brightness), int(245 * edge_brightness), int(200 * edge_brightness))
+                edge_height = half_height - (2 - edge) * max(1, half_height // 6)
+                pygame.draw.line(cone, color, (x, height // 2 - edge_height), (x, height // 2 + edge_height))
+        return cone.convert()
+
+    @staticmethod
+    def create_taillights(car_size):
+        car_width, car_height = car_size
+        radius = max(2, car_height // 4)
+        glow = pygame.Surface((radius * 2, car_height + radius * 2))
+        glow.fill((0, 0, 0))
+
+        # Two red glows at the corners of the car's rear
+        for center_y in (radius + car_height // 5, radius + car_height - car_height // 5):
+            for r in range(radius, 0, -1):
+                brightness = 1 - r / radius
+                pygame.draw.circle(glow, (int(255 * brightness), int(30 * brightness), int(20 * brightness)), (radius, center_y), r)
+        return glow.convert()
+
+    def set_sprites(self, sprites):
+        if sprites is not self.sprites:
+            self.sprites = sprites
+            self.cache.clear()
+
+    def get_sprites(self, level):
+        if level not in self.cache:
+            intensity = int(255 * self.max_intensity * level / (self.levels - 1))
+            darkened = []
+            for sprite in self.sprites:
+                sprite = sprite.copy()
+                sprite.fill((intensity, intensity, intensity), special_flags=pygame.BLEND_RGB_MULT)
+                darkened.append(sprite)
+            self.cache[level] = darkened
+        return self.cache[level]
+
+    def draw(self, screen, car_rect, level, headlights=True):
+        cone, taillights = self.get_sprites(level)
+        # Cars drive to the right - headlights in front (right), taillights behind (left)
+        if headlights:
+            screen.blit(cone, (car_rect.right - car_rect.width // 10, car_rect.centery - cone.get_height() // 2), special_flags=pygame.BLEND_RGB_ADD)
+        screen.blit(taillights, (car_rect.left - taillights.get_width() // 2, car_rect.centery - taillights.get_height() // 2), special_flags=pygame.BLEND_RGB_ADD)
+
+
+class DecalLayer:
+    """
+    Class for a layer of decals (tyre marks), that scrolls and wraps with the background.
+
+    The layer uses road coordinates, wrapped around its width (the road is longer than the layer - see ProceduralRoad).
+    New marks are drawn into it once and stay there - drawing the layer is one blit (per background tile),
+    however many marks there are. Only the part of the layer containing marks is blitted.
+
+    Args:
+        width (int): Width of the layer (wider than the screen).
+        height (int): Height of the layer (height of the background image).
+
+    Attributes:
+        surface (pygame.Surface): The layer, transparent where there are no marks.
+        marked_rect (pygame.Rect): The part of the layer containing marks (None if there are none).
+        changed_rects (list): Parts of the layer changed since the last call of take_changed_rects().
+        last_positions (dict): Last position of each mark trail (e.g. each wheel), so marks are drawn as lines.
+
+    Methods:
+        add_mark(trail, pos, color, width): Continues a trail of marks to pos.
+        lift(trail): Ends a trail (e.g. wheel left the grass).
+        draw(screen, pos): Draws the layer with its top left corner at pos.
+        clear(rect): Removes all marks (only inside rect, if it is set).
+        take_changed_rects(): Returns the parts of the layer changed since the last call (see ScrollingBackground).
+    """
+    def __init__(self, width, height):
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+        self.surface.fill((0, 0, 0, 0))
+        self.marked_rect = None
+        self.changed_rects = []
+        self.last_positions = {}
+
+    def add_mark(self, trail, pos, color, width):
+        last_pos = self.last_positions.get(trail, pos)
+        self.last_positions[trail] = pos
+
+        # The trail wrapped around the end of the layer - starting a new line
+        if abs(pos[0] - last_pos[0]) > self.surface.get_width() // 2:
+            last_pos = pos
+
+        # Marks crossing the edge of the layer are drawn on both sides, so they wrap with the road
+        for offset in (-self.surface.get_width(), 0, self.surface.get_width()):
+            start = (last_pos[0] + offset, last_pos[1])
+            end = (pos[0] + offset, pos[1])
+            mark_rect = pygame.draw.line(self.surface, color, start, end, width)
+            mark_rect = mark_rect.clip(self.surface.get_rect())
+            if mark_rect.width and mark_rect.height:
+                self.marked_rect = mark_rect if self.marked_rect is None else self.marked_rect.union(mark_rect)
+                self.changed_rects.append(mark_rect)
+
+    def lift(self, trail):
+        self.last_positions.pop(trail, None)
+
+    def draw(self, screen, pos):
+        if self.marked_rect is None:
+            return
+        screen.blit(self.surface, (pos[0] + self.marked_rect.x, pos[1] + self.marked_rect.y), self.marked_rect)
+
+    def clear(self, rect=None):
+        if rect is not None:
+            self.surface.fill((0, 0, 0, 0), rect)
+            self.changed_rects.append(rect.clip(self.surface.get_rect()))
+            return
+        self.surface.fill((0, 0, 0, 0))
+        self.marked_rect = None
+        self.changed_rects = [self.surface.get_rect()]
+        self.last_positions.clear()
+
+    def take_changed_rects(self):
+        changed_rects = self.changed_rects
+        self.changed_rects = []
+        return changed_rects
+
+
+class ScrollingBackground:
+    """
+    Class for the visible part of the scrolling background (including the tyre marks), kept in a surface the size of the screen.
+
+    The background only moves a few pixels to the left every frame. Instead of drawing the road chunks
+    and blending the tyre marks over the whole screen width every frame, the cache is shifted with Surface.scroll()
+    and only the strip becoming visible at the right edge is drawn from the road and the decal layer.
+    New tyre marks are composed into the cache where they were added.
+    Drawing the cache onto the screen is a single opaque blit.
+    This pays off, although the cache is shifted and blitted in full every frame: the road chunks have a colour key
+    (white), which makes blitting them slower than the plain copies, and the marked part of the decal layer only grows,
+    so blending it would cost more and more (see background_benchmark.py).
+    Chunks of the road, that were baked again (day/night transition, display format), are drawn again where they are visible.
+    The whole cache is drawn again, when it moved further than the screen width.
+
+    Attributes:
+        surface (pygame.Surface): The cache - as wide as the screen and as high as the road.
+        composed (bool): Whether the cache was drawn (False, if it has to be drawn again completely).
+        bg_x (int): X-coordinate of the road, when the cache was drawn.
+
+    Methods:
+        draw(screen, pos_y, road, decals, bg_x): Updates the cache and draws it onto the screen at pos_y.
+    """
+    def __init__(self):
+        self.surface = None
+        self.composed = False
+        self.bg_x = 0
+
+    def draw(self, screen, pos_y, road, decals, bg_x):
+        size = (screen.get_width(), road.height)
+        # The cache has the format of the screen (like the baked chunks), so it is copied without conversion
+        if self.surface is None or self.surface.get_size() != size or self.surface.get_bitsize() != screen.get_bitsize():
+            self.surface = pygame.Surface(size, 0, screen)
+            self.composed = False
+
+        shift = self.bg_x - bg_x
+        changed_segments = road.take_changed_segments()
+        if not self.composed or not 0 <= shift < size[0]:
+            self.composed = True
+            self.compose(self.surface.get_rect(), bg_x, road, decals)
+            decals.take_changed_rects()
+        else:
+            if shift:
+                self.surface.scroll(-shift, 0)
+                self.compose(pygame.Rect(size[0] - shift, 0, shift, size[1]), bg_x, road, decals)
+            # Changed parts of the decal layer are visible once per repetition of the layer
+            for rect in decals.take_changed_rects():
+                for x in self.get_decal_positions(bg_x, decals):
+                    self.compose(rect.move(x, 0), bg_x, road, decals)
+            for x, segment in road.get_chunks(bg_x, 0, size[0]):
+                if segment in changed_segments:
+                    self.compose(pygame.Rect(x, 0, road.chunk_width, size[1]), bg_x, road, decals)
+        self.bg_x = bg_x
+
+        screen.blit(self.surface, (0, pos_y))
+
+    def compose(self, rect, bg_x, road, decals):
+        # Drawing the road chunks and the decals (repeated every width of the decal layer) - only inside rect
+        rect = rect.clip(self.surface.get_rect())
+        if not rect:
+            return
+        self.surface.set_clip(rect)
+        # The background images have transparent (white) pixels - they show black, like on the cleared screen
+        self.surface.fill((0, 0, 0), rect)
+        road.draw(self.surface, bg_x, 0, rect.left, rect.right)
+        for x in self.get_decal_positions(bg_x, decals):
+            decals.draw(self.surface, (x, 0))
+        self.surface.set_clip(None)
+
+    def get_decal_positions(self, bg_x, decals):
+        # The decal layer wraps around - the positions of its left edge, where it is visible
+        width = decals.surface.get_width()
+        return range(bg_x % width - width, self.surface.get_width(), width)
+
+
+class ProceduralRoad:
+    """
+    Class for the road, built from chunks of a fixed width - each chunk shows one segment of the background image.
+
+    The background images are cut into segments as wide as a chunk (see Game.cut_road_segments()). The segment of each new chunk is chosen procedurally:
+    usually the segment continuing the one before, but where two segments join without cutting through a tree and
+    the colors of their edges match (see find_joins()), the road may continue with another segment.
+    So the road doesn't repeat in a fixed loop.
+
+    Only the chunks on the screen and the next one are kept. Their segments are baked (unpacked from the current
+    day/night image and scaled up to full size at a reduced texture quality tier) when they are needed first,
+    chunks that scrolled past the left edge of the screen are evicted. The memory does not depend on how far the road goes.
+    When the source changes, the baked segments are kept and drawn, until they are baked again - one per update(),
+    so a day/night step doesn't bake all chunks on the screen in one frame.
+
+    Road coordinates are screen coordinates minus bg_x (which keeps decreasing) - chunk i starts at i * chunk_width.
+
+    Args:
+        chunk_width (int): Width of the chunks (pixels).
+        height (int): Height of the road (pixels).
+        joins (list): For each segment the segments, that can follow it apart from the next one (see find_joins()).
+        bake (callable): Returns the chunk surface and its grass mask (at any resolution) for a segment of source.
+        jump_chance (float): Chance, that the road continues with another segment at a join.
+        seed (int): Seed of the segment choice (None for a different road every time).
+
+    Attributes:
+        segments (dict): Segment of each kept chunk (by chunk index).
+        baked (dict): Surface, grass mask and source version of the segments of the kept chunks (by segment).
+        source: The segments of the current background image (passed on to bake).
+        source_version (int): Increased, when the source changes (the baked segments become stale).
+        changed_segments (list): Segments baked again since the last call of take_changed_segments().
+
+    Methods:
+        set_source(source): Sets the segments of the background image the chunks are baked from.
+        refresh(): Marks all baked segments as stale (e.g. after a display format change).
+        update(bg_x, view_width): Keeps the chunks on the screen and the next one, returns the indices of the evicted chunks.
+        take_changed_segments(): Returns the segments baked again since the last call (see ScrollingBackground).
+        get_chunks(bg_x, left, right): Returns (x, segment) of the chunks between the screen x-coordinates left and right.
+        draw(surface, bg_x, y, left, right): Draws the chunks between left and right.
+        is_grass(x, y): Whether there is grass at the road coordinates (x, y).
+        find_joins(background, trees, segment_width, tolerance): Finds the segments, that can follow each segment.
+    """
+    TREE_ALPHA = 32  # Trees with a lower alpha value at the edge of a segment are not cut by a join
+
+    def __init__(self, chunk_width, height, joins, bake, jump_chance=0.5, seed=None):
+        self.chunk_width = chunk_width
+        self.height = height
+        self.joins = joins
+        self.bake = bake
+        self.jump_chance = jump_chance
+        self.random = random.Random(seed)
+        self.segments = {}
+        self.last_index = None
+        self.baked = {}
+        self.source = None
+        self.source_version = 0
+        self.changed_segments = []
+
+    def set_source(self, source):
+        self.source = source
+        self.refresh()
+
+    def refresh(self):
+        self.source_version += 1
+
+    def get_segment(self, index):
+        # The segments are chosen in the order of the chunks - the road only scrolls to the left
+        if self.last_index is None:
+            self.last_index = index - 1
+        while self.last_index < index:
+            self.segments[self.last_index + 1] = self.choose_segment(self.segments.get(self.last_index))
+            self.last_index += 1
+        return self.segments[index]
+
+    def choose_segment(self, previous):
+        # The road starts with the first segment, like the background image
+        if previous is None:
+            return 0
+        next_segment = previous + 1 if previous + 1 < len(self.joins) else None
+        joins = self.joins[previous]
+        if joins and (next_segment is None or self.random.random() < self.jump_chance):
+            return self.random.choice(joins)
+        return next_segment if next_segment is not None else 0
+
+    def get_baked(self, segment):
+        baked = self.baked.get(segment)
+        if baked is None:
+            baked = self.baked[segment] = self.bake(segment) + (self.source_version,)
+        return baked
+
+    def update(self, bg_x, view_width):
+        first = -bg_x // self.chunk_width
+        last = (view_width - 1 - bg_x) // self.chunk_width + 1
+        # Chunks on the screen are needed right away
+        visible = [self.get_segment(index) for index in range(first, last)]
+        missing = [segment for segment in visible if segment not in self.baked]
+        for segment in missing:
+            self.get_baked(segment)
+
+        # The next chunk and stale segments are baked one per call
+        if not missing:
+            next_segment = self.get_segment(last)
+            stale = [segment for segment in visible + [next_segment] if segment in self.baked and self.baked[segment][2] != self.source_version]
+            if next_segment not in self.baked:
+                self.get_baked(next_segment)
+            elif stale:
+                self.baked[stale[0]] = self.bake(stale[0]) + (self.source_version,)
+                self.changed_segments.append(stale[0])
+
+        evicted = [index for index in self.segments if index < first]
+        for index in evicted:
+            del self.segments[index]
+        # Segments, that are not shown by any kept chunk
+        for segment in set(self.baked) - set(self.segments.values()):
+            del self.baked[segment]
+        return evicted
+
+    def take_changed_segments(self):
+        changed_segments = self.changed_segments
+        self.changed_segments = []
+        return changed_segments
+
+    def get_chunks(self, bg_x, left, right):
+        first = (left - bg_x) // self.chunk_width
+        last = (right - 1 - bg_x) // self.chunk_width
+        return [(bg_x + index * self.chunk_width, self.get_segment(index)) for index in range(first, last + 1)]
+
+    def draw(self, surface, bg_x, y=0, left=0, right=None):
+        right = surface.get_width() if right is None else right
+        surface.blits(
+            [(self.get_baked(segment)[0], (x, y)) for x, segment in self.get_chunks(bg_x, left, right)], doreturn=False
+        )
+
+    def is_grass(self, x, y):
+        index = x // self.chunk_width
+        _, grass_mask, _ = self.get_baked(self.get_segment(index))
+        # The mask may have a lower resolution than the chunk
+        mask_width, mask_height = grass_mask.shape
+        return grass_mask[(x - index * self.chunk_width) * mask_width // self.chunk_width, y * mask_height // self.height]
+
+    @classmethod
+    def find_joins(cls, background, trees, segment_width, tolerance):
+        """
+        Finds the segments of the background image, that can follow each segment (apart from the next one).
+
+        A segment can follow another one, if no tree crosses the right edge of the first or the left edge of the second
+        segment and the mean color difference of the two edges is at most tolerance.
+        The last segment is always followed by the segment, that matches it best (if no segment matches),
+        so the road goes on.
+
+        Args:
+            background (pygame.Surface): The background image.
+            trees (pygame.Surface): The cut out tree image (with per pixel alpha) of the same size.
+            segment_width (int): Width of the segments (pixels).
+            tolerance (float): Maximum mean color difference of the edges.
+
+        Returns:
+            list: For each segment the segments, that can follow it.
+        """
+        colors = pygame.surfarray.array3d(background).astype(np.int16)
+        tree_alpha = pygame.surfarray.array_alpha(trees)
+        count = background.get_width() // segment_width
+
+        starts = colors[np.arange(count) * segment_width]
+        ends = colors[np.arange(1, count + 1) * segment_width - 1]
+        free_starts = tree_alpha[np.arange(count) * segment_width].max(axis=1) < cls.TREE_ALPHA
+        free_ends = tree_alpha[np.arange(1, count + 1) * segment_width - 1].max(axis=1) < cls.TREE_ALPHA
+        # Mean color difference of the right edge of each segment (rows) and the left edge of each segment (columns)
+        differences = np.abs(ends[:, None] - starts[None, :]).mean(axis=(2, 3))
+
+        joins = []
+        for segment in range(count):
+            matches = free_ends[segment] & free_starts & (differences[segment] <= tolerance)
+            # The next segment can always follow (see choose_segment())
+            if segment + 1 < count:
+                matches[segment + 1] = False
+            segment_joins = np.flatnonzero(matches).tolist()
+            if segment + 1 == count and not segment_joins:
+                segment_joins = [int(np.argmin(differences[segment]))]
+            joins.append(segment_joins)
+        return joins
+
+
+class ParticleSystem:
+    """
+    Class for all particles in the game (crash explosions, exhaust smoke).
+
+    The particles live in preallocated NumPy arrays (position, velocity, lifetime and kind), 
+    so all particles are moved and aged at once, without any Python object per particle.
+    The number of particles is fixed (capacity) - when all are in use, new particles are dropped.
+    So even a pile-up can not make drawing particles more expensive than capacity blits.
+    Particles are drawn with prepared images (stamps) for each kind and age step (see Game.create_particle_stamps()).
+
+    Args:
+        capacity (int): Maximum number of particles.
+        stamps (list): One list of surfaces (one per age step) for each particle kind.
+
+    Attributes:
+        position, velocity (numpy.ndarray): Position (pixels) and velocity (pixels per millisecond) of each particle.
+        drift (numpy.ndarray): Constant velocity added to each particle (e.g. the speed of the road).
+        lifetime, max_lifetime (numpy.ndarray): Remaining and total lifetime of each particle (milliseconds).
+        kind (numpy.ndarray): Index of each particle's stamps (FIRE, SMOKE or SPARK).
+        alive (numpy.ndarray): True for particles in use.
+
+    Methods:
+        emit(kind, x, y, count, speed, lifetime, drift, size): Starts up to count new particles at (x, y).
+        update(frame_time): Moves and ages all particles.
+        draw(screen): Draws all particles.
+        clear(): Removes all particles.
+    """
+    FIRE, SMOKE, SPARK = range(3)
+    AGE_STEPS = 8
+    DRAG = 0.995  # Velocity is multiplied by this every millisecond
+
+    def __init__(self, capacity, stamps):
+        self.capacity = capacity
+        self.stamps = stamps
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.drift = np.zeros((capacity, 2), dtype=np.float32)
+        self.lifetime = np.zeros(capacity, dtype=np.float32)
+        self.max_lifetime = np.ones(capacity, dtype=np.float32)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.random = np.random.default_rng()
+
+    def emit(self, kind, x, y, count, speed, lifetime, drift=(0, 0), size=1.0):
+        # Free slots - if there are not enough, fewer particles are emitted
+        slots = np.flatnonzero(~self.alive)[:count]
+        count = len(slots)
+        if count == 0:
+            return
+
+        angles = self.random.uniform(0, 2 * np.pi, count)
+        speeds = self.random.uniform(0.2 * speed, speed, count)
+        self.position[slots] = (x, y)
+        self.velocity[slots, 0] = np.cos(angles) * speeds
+        self.velocity[slots, 1] = np.sin(angles) * speeds
+        self.drift[slots] = drift
+        self.max_lifetime[slots] = self.random.uniform(0.6 * lifetime, lifetime, count)
+        # Smaller particles start at a later age step (stamps grow or shrink with age)
+        self.lifetime[slots] = self.max_lifetime[slots] * size
+        self.kind[slots] = kind
+        self.alive[slots] = True
+
+    def update(self, frame_time):
+        if not self.alive.any():
+            return
+
+        self.position += (self.velocity + self.drift) * frame_time
+        self.velocity *= self.DRAG ** frame_time
+        self.lifetime -= frame_time
+        self.alive &= self.lifetime > 0
+
+    def draw(self, screen):
+        indices = np.flatnonzero(self.alive)
+        if len(indices) == 0:
+            return
+
+        age_steps = ((1 - self.lifetime[indices] / self.max_lifetime[indices]) * (self.AGE_STEPS - 1)).astype(np.int32)
+        positions = self.position[indices].astype(np.int32)
+
+        blit_sequence = []
+        for kind, age_step, (x, y) in zip(self.kind[indices].tolist(), age_steps.tolist(), positions.tolist()):
+            stamp = self.stamps[kind][age_step]
+            # Stamps are centered on the particle's position
+            blit_sequence.append((stamp, (x - stamp.get_width() // 2, y - stamp.get_height() // 2)))
+        screen.blits(blit_sequence, doreturn=False)
+
+    def clear(self):
+        self.alive[:] = False
+
+
+class TrafficModel:
+    """
+    Class for the lane-following traffic of the enemy cars.
+
+    Every car lane has its own speed distribution. A new car gets a desired speed from the distribution of its lane
+    and drives at it, as long as the road in front of it is free. Closer than the following distance to the car in front
+    (in the same lane), it adapts its speed to that car - and brakes harder, when it is closer than the minimum gap.
+    Speeding up and braking are limited per frame, so the cars don't jump between speeds.
+
+    Speeds are in pixels per frame, that a car falls back on the screen: the road moves left with Game.BACKGROUND_SPEED
+    and the cars drive right, so a car with a higher speed is slower on the road and braking increases the speed.
+    The car in front of a car is the next car to its right. The player car is not part of the traffic.
+
+    The cars live in preallocated NumPy arrays (like the particles, see ParticleSystem) - every car keeps its slot,
+    until it is removed. New cars enter behind all cars of their lane (on the right) and cars don't pass each other,
+    so the car in front of each car is stored once, when a car is added, and all cars are updated at once without sorting.
+    The number of cars is fixed (capacity) - when all slots are in use, no new car is added.
+
+    Args:
+        capacity (int): Maximum number of cars.
+        lane_speeds (list): (mean, spread) of the desired speed for each lane.
+        min_gap (float): Gap (pixels), that the cars keep to the car in front.
+        following_distance (float): Cars closer than this (pixels) to the car in front adapt their speed.
+        gap_gain (float): Speed added per pixel, that a car is closer than the minimum gap.
+        acceleration (float): Maximum speed change per frame, when speeding up.
+        braking (float): Maximum speed change per frame, when braking.
+
+    Attributes:
+        lane (numpy.ndarray): Lane of each car.
+        x, half_width (numpy.ndarray): Horizontal center (sub-pixel) and half the width of each car.
+        speed, desired_speed (numpy.ndarray): Current and desired speed of each car (0 for free slots).
+        front (numpy.ndarray): Slot of the car in front of each car. The road in front of the first car of each lane is free:
+            it points to the extra last slot, a car that is infinitely far ahead.
+        active (numpy.ndarray): True for slots in use.
+
+    Methods:
+        add(lane, x, width): Adds a car with a random desired speed for its lane and returns its slot (None, when full).
+        remove(slot): Removes a car.
+        clear(): Removes all cars.
+        update(): Computes the speed of all cars, moves them and returns the rounded x position of each slot.
+    """
+    def __init__(self, capacity, lane_speeds, min_gap, following_distance, gap_gain, acceleration, braking):
+        self.lane_speeds = lane_speeds
+        self.min_gap = min_gap
+        self.following_distance = following_distance
+        self.gap_gain = gap_gain
+        self.acceleration = acceleration
+        self.braking = braking
+
+        # One extra slot for the free road (see front) - it never moves
+        self.free_road = capacity
+        self.lane = np.zeros(capacity + 1, dtype=np.int8)
+        self.x = np.zeros(capacity + 1)
+        self.x[self.free_road] = np.inf
+        self.half_width = np.zeros(capacity + 1)
+        self.speed = np.zeros(capacity + 1)
+        self.desired_speed = np.zeros(capacity + 1)
+        self.front = np.full(capacity + 1, self.free_road, dtype=np.intp)
+        self.active = np.zeros(capacity + 1, dtype=bool)
+        self.active[self.free_road] = True
+
+    def desired_speed_for(self, lane):
+        mean, spread = self.lane_speeds[lane]
+        # Cars always fall back, so they leave the screen on the left
+        return max(0.1, random.uniform(mean - spread, mean + spread))
+
+    def add(self, lane, x, width):
+        free = np.flatnonzero(~self.active)
+        if len(free) == 0:
+            return None
+        slot = free[0]
+
+        # The new car is the car in front of the last car of its lane
+        self.front[self.active & (self.lane == lane) & (self.front == self.free_road)] = slot
+        self.front[self.free_road] = self.front[slot] = self.free_road
+
+        self.lane[slot] = lane
+        self.x[slot] = x
+        self.half_width[slot] = width / 2
+        self.speed[slot] = self.desired_speed[slot] = self.desired_speed_for(lane)
+        self.active[slot] = True
+        return int(slot)
+
+    def remove(self, slot):
+        # The car behind follows the car in front of the removed car now
+        self.front[self.front == slot] = self.front[slot]
+        self.front[slot] = self.free_road
+        self.speed[slot] = self.desired_speed[slot] = 0
+        self.active[slot] = False
+
+    def clear(self):
+        self.front[:] = self.free_road
+        self.speed[:] = 0
+        self.desired_speed[:] = 0
+        self.active[:self.free_road] = False
+
+    def update(self):
+        # Gap to the car in front - free slots and the first car of each lane have a free road (and free slots don't move)
+        cars = slice(0, self.free_road)
+        front = self.front[cars]
+        x, speed, desired_speed = self.x[cars], self.speed[cars], self.desired_speed[cars]
+        gap = (self.x[front] - self.half_width[front]) - (x + self.half_width[cars])
+        target_speed = np.where(
+            gap < self.following_distance,
+            np.maximum(desired_speed, self.speed[front] + (self.min_gap - gap) * self.gap_gain),
+            desired_speed,
+        )
+        speed += np.clip(target_speed - speed, -self.acceleration, self.braking)
+        x -= speed
+        return np.rint(x).astype(np.intp).tolist()
+
+
+class QualityGovernor:
+    """
+    Class for adapting the quality level to the measured frame time.
+
+    The work time of every frame (without the time waiting for the next frame) is averaged over a window of frames.
+    If a window's average exceeds down_threshold of the frame budget, quality is stepped down one level right away.
+    It is only stepped up again after up_windows windows in a row stayed below up_threshold of the budget -
+    the gap between the two thresholds (hysteresis) keeps the level from flipping back and forth.
+
+    Args:
+        budget_ms (float): Time available per frame (milliseconds).
+        window_frames (int): Number of frames per window.
+        down_threshold (float): Fraction of the budget, above which quality is stepped down.
+        up_threshold (float): Fraction of the budget, below which quality may be stepped up.
+        up_windows (int): Number of windows in a row below up_threshold, before quality is stepped up.
+        fixed_level (int): Level to keep (no adaptation), None to adapt.
+
+    Attributes:
+        level (int): Current quality level, 0 (full quality) to len(LEVEL_NAMES) - 1.
+
+    Methods:
+        record(work_ms): Adds the work time of a frame - returns True, if the level changed.
+        get_level_name(): Returns the name of the current level.
+    """
+    LEVEL_NAMES = ("FULL", "HIGH", "MEDIUM", "LOW")
+
+    def __init__(self, budget_ms, window_frames=120, down_threshold=0.9, up_threshold=0.6, up_windows=5, fixed_level=None):
+        self.budget_ms = budget_ms
+        self.window_frames = window_frames
+        self.down_threshold = down_threshold
+        self.up_threshold = up_threshold
+        self.up_windows = up_windows
+        self.fixed_level = fixed_level
+        self.level = fixed_level if fixed_level is not None else 0
+        self.window_time = 0.0
+        self.window_count = 0
+        self.good_windows = 0
+
+    def record(self, work_ms):
+        if self.fixed_level is not None:
+            return False
+
+        self.window_time += work_ms
+        self.window_count += 1
+        if self.window_count < self.window_frames:
+            return False
+
+        average = self.window_time / self.window_count
+        self.window_time = 0.0
+        self.window_count = 0
+
+        if average > self.budget_ms * self.down_threshold:
+            self.good_windows = 0
+            if self.level < len(self.LEVEL_NAMES) - 1:
+                self.level += 1
+                return True
+        elif average < self.budget_ms * self.up_threshold:
+            self.good_windows += 1
+            if self.good_windows >= self.up_windows and self.level > 0:
+                self.good_windows = 0
+                self.level -= 1
                 return True
+        else:
+            self.good_windows = 0
         return False
 
+    def get_level_name(self):
+        return self.LEVEL_NAMES[self.level]
+
+
+class SceneTransition:
+    """
+    Class for a fade to black between two screens.
+
+    The transition is advanced once per frame by the loop of the current screen, so the game keeps 
+    handling events and playing sounds while fading. The prefetch generator is advanced in between, 
+    a few milliseconds per frame, so the next screen is prepared while the fade is playing.
+
+    The fade reproduces the old blocking fade: 64 steps, each blending black with an alpha of the step number
+    over the already darkened screen.
+
+    Args:
+        on_complete (callable): Called when the fade is over and the prefetch is done.
+        duration (int): Duration of the fade in milliseconds.
+        prefetch (generator, optional): Work for the next screen, split into steps by yield.
+
+    Attributes:
+        start_time (int): Timestamp of the start of the transition.
+        fade_surface (pygame.Surface): Black surface, blended over the screen.
+
+    Methods:
+        update(screen): Runs prefetch steps, draws the fade and returns True, when the transition is finished.
+    """
+    FADE_STEPS = 256 // 4
+    PREFETCH_BUDGET_MS = 6
+
+    def __init__(self, on_complete, duration, prefetch=None):
+        self.on_complete = on_complete
+        self.duration = duration
+        self.prefetch = prefetch
+        self.start_time = pygame.time.get_ticks()
+        self.fade_surface = None
+
+    def update(self, screen):
+        # Preparing the next screen, but only for a few milliseconds, so the fade keeps running smoothly
+        deadline = time.perf_counter() + self.PREFETCH_BUDGET_MS / 1000
+        while self.prefetch is not None and time.perf_counter() < deadline:
+            try:
+                next(self.prefetch)
+            except StopIteration:
+                self.prefetch = None
+
+        # The screen is redrawn every frame, so the alpha has to include all previous fade steps
+        progress = min(1.0, (pygame.time.get_ticks() - self.start_time) / self.duration)
+        brightness = 1.0
+        for alpha in range(int(progress * self.FADE_STEPS)):
+            brightness *= 1 - alpha / 255
+
+        if self.fade_surface is None or self.fade_surface.get_size() != screen.get_size():
+            self.fade_surface = pygame.Surface(screen.get_size())
+            self.fade_surface.fill((0, 0, 0))
+        self.fade_surface.set_alpha(int(255 * (1 - brightness)))
+        screen.blit(self.fade_surface, (0, 0))
+
+        return progress >= 1.0 and self.prefetch is None
+
+
+class TextureQuality:
+    """
+    Class for the texture quality tiers of the asset groups (backgrounds, trees, sprites).
+
+    A group is loaded at full, half or quarter texture resolution.
+    Textures of a reduced tier are scaled up to their full size, before they are drawn - sprites and canopy layers
+    when they are loaded, road chunks when they are baked. A tier only saves memory for textures, that are kept
+    at the reduced resolution as well (count larger than active_count, see estimate()).
+    Tiers, that are not set, are chosen at startup: all groups start at full resolution and the group, 
+    which saves the most memory, is reduced a tier, until the estimated memory fits the budget.
+
+    Args:
+        textures (dict): For each group a list of (size, count, active_count, coverage) entries - the size of the textures
+            at full resolution, how many of them are loaded, how many are used (scaled up) at the same time and which
+            fraction of their area is kept (e.g. canopy tiles).
+        budget (int): Memory budget for all groups (bytes), None for no limit.
+        tiers (dict): Tier of each group ("full", "half", "quarter"), None to choose it.
+
+    Attributes:
+        tiers (dict): The tier of each group.
+
+    Methods:
+        get_scale(group): Returns the factor the group's textures are reduced by (1, 2 or 4).
+        scaled_size(group, size): Returns the size a texture of the group is kept at.
+        materialise(group, source, size): Returns the texture scaled up to its full size.
+        estimate(group, tier): Returns the estimated resident memory of the group at a tier (bytes).
+        get_report(loaded): Returns a report of the resident memory of each group under each tier.
+    """
+    TIER_SCALES = {"full": 1, "half": 2, "quarter": 4}
+    BYTES_PER_PIXEL = 4
+
+    def __init__(self, textures, budget=None, tiers=None):
+        self.textures = textures
+        self.budget = budget
+        tiers = tiers or {}
+        for group, tier in tiers.items():
+            if tier is not None and tier not in self.TIER_SCALES:
+                raise ValueError(f"Unknown texture quality tier '{tier}' for {group} (use {', '.join(self.TIER_SCALES)})")
+        self.tiers = {group: tiers.get(group) or "full" for group in textures}
+
+        # Groups without a configured tier can be reduced to fit the budget
+        adjustable = [group for group in textures if tiers.get(group) is None]
+        while self.budget is not None and self.estimate_total() > self.budget:
+            savings = []
+            for group in adjustable:
+                lower_tier = self.get_lower_tier(self.tiers[group])
+                if lower_tier is not None:
+                    saving = self.estimate(group, self.tiers[group]) - self.estimate(group, lower_tier)
+                    if saving > 0:
+                        savings.append((saving, group, lower_tier))
+            if not savings:
+                break
+            _, group, lower_tier = max(savings)
+            self.tiers[group] = lower_tier
+
+    def get_lower_tier(self, tier):
+        tier_names = list(self.TIER_SCALES)
+        index = tier_names.index(tier) + 1
+        return tier_names[index] if index < len(tier_names) else None
+
+    def get_scale(self, group):
+        return self.TIER_SCALES[self.tiers[group]]
+
+    def scaled_size(self, group, size):
+        scale = self.get_scale(group)
+        return max(1, size[0] // scale), max(1, size[1] // scale)
+
+    def materialise(self, group, source, size):
+        scale = self.get_scale(group)
+        if scale == 1:
+            return source
+        if isinstance(source, SparseCanopy):
+            return source.scaled(scale)
+        return pygame.transform.scale(source, size)
+
+    def estimate(self, group, tier):
+        scale = self.TIER_SCALES[tier]
+        total = 0
+        for (width, height), count, active_count, coverage in self.textures[group]:
+            kept = (width // scale) * (height // scale) * count
+            if scale != 1:
+                kept += width * height * active_count
+            total += int(kept * coverage) * self.BYTES_PER_PIXEL
+        return total
+
+    def estimate_total(self):
+        return sum(self.estimate(group, tier) for group, tier in self.tiers.items())
+
+    def get_summary(self):
+        tiers = ", ".join(f"{group} {tier}" for group, tier in self.tiers.items())
+        budget = f" of {self.budget / 1e6:.0f} MB budget" if self.budget is not None else ""
+        return f"Texture quality: {tiers} (estimated {self.estimate_total() / 1e6:.0f} MB{budget})"
+
+    def get_report(self, loaded=None):
+        lines = [self.get_summary()]
+        for group, chosen_tier in self.tiers.items():
+            estimates = " | ".join(
+                f"{tier}{'*' if tier == chosen_tier else ''} {self.estimate(group, tier) / 1e6:.1f} MB" for tier in self.TIER_SCALES
+            )
+            line = f"  {group}: {estimates}"
+            if loaded is not None and group in loaded:
+                line += f" (loaded {loaded[group] / 1e6:.1f} MB)"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class AssetRegistry:
+    """
+    Class for a registry of all loaded surfaces.
+
+    convert() and convert_alpha() convert a surface to the pixel format of the display, that is active at that moment.
+    When the display mode changes (e.g. a new screen resolution), the pixel format can change as well.
+    Blitting surfaces of a different format is much slower, as every pixel has to be converted during the blit.
+    The registry remembers the display format each asset was converted for and converts it again,
+    when it is fetched after a mode change (lazily - only assets that are actually used get converted).
+
+    Args:
+        verbose (bool): Prints every conversion (for debugging, see Game.DEBUG_SURFACE_FORMATS).
+
+    Attributes:
+        entries (dict): Maps asset names to [value, alpha, format_key]. value is a surface or a (nested) list of surfaces.
+        format_key (tuple): Identifies the pixel format of the active display.
+        reported (set): Ids of surfaces already reported in the diagnostic (every surface is reported once).
+        verbose (bool): Prints every conversion.
+
+    Methods:
+        register(name, value, alpha): Adds a surface (or (nested) list of surfaces) converted for the active display.
+        notice_mode_change(): Has to be called after every pygame.display.set_mode().
+        get(name): Returns the asset, converted to the active display format if necessary.
+        is_display_format(surface): Checks if a surface can be blitted onto the display without conversion.
+        check_blit(surface): Prints a report, if a surface in a mismatched format is blitted.
+    """
+    def __init__(self, verbose=False):
+        self.entries = {}
+        self.format_key = None
+        self.reported = set()
+        self.verbose = verbose
+
+    @staticmethod
+    def display_format_key():
+        display = pygame.display.get_surface()
+        if display is None:
+            return None
+        return (display.get_bitsize(), display.get_masks()[:3])
+
+    def register(self, name, value, alpha=False):
+        self.entries[name] = [value, alpha, self.format_key]
+        return value
+
+    def notice_mode_change(self):
+        self.format_key = self.display_format_key()
+
+    def get(self, name):
+        entry = self.entries[name]
+        value, alpha, format_key = entry
+
+        if format_key != self.format_key:
+            if self.verbose:
+                print(f"Converting '{name}' to the new display format")
+            value = self.convert(value, alpha)
+            entry[0] = value
+            entry[2] = self.format_key
+
+        return value
+
+    @classmethod
+    def convert(cls, value, alpha):
+        # Lists (also lists of lists) are converted surface by surface
+        if isinstance(value, list):
+            return [cls.convert(item, alpha) for item in value]
+        return value.convert_alpha() if alpha else value.convert()
+
+    def is_display_format(self, surface):
+        display = pygame.display.get_surface()
+        same_masks = surface.get_masks()[:3] == display.get_masks()[:3]
+
+        # Surfaces with per pixel alpha are blitted fastest in 32 bit with the color masks of the display
+        if surface.get_flags() & pygame.SRCALPHA:
+            return same_masks and surface.get_bitsize() == 32
+        return same_masks and surface.get_bitsize() == display.get_bitsize()
+
+    def check_blit(self, surface):
+        if id(surface) in self.reported or self.is_display_format(surface):
+            return
+        self.reported.add(id(surface))
+
+        # Name the asset, if the surface is registered
+        name = "unregistered surface"
+        for asset_name, (value, _, _) in self.entries.items():
+            if surface is value or (isinstance(value, list) and any(surface is v for v in value)):
+                name = asset_name
+                break
+        print(f"Slow blit: {name} {surface.get_size()} has {surface.get_bitsize()} bit {surface.get_masks()}, "
+              f"display has {pygame.display.get_surface().get_bitsize()} bit {pygame.display.get_surface().get_masks()}")
+
+
+class FormatCheckingSurface:
+    """
+    Wraps the display surface and checks the format of every surface blitted onto it.
+
+    This is only used for debugging (Game.DEBUG_SURFACE_FORMATS).
+    Everything apart from blit() is passed on to the wrapped surface.
+    It is not a pygame.Surface - pygame.draw functions can't draw onto it, so self.screen is only drawn on with its methods.
+    """
+    def __init__(self, surface, registry):
+        self.surface = surface
+        self.registry = registry
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        self.registry.check_blit(source)
+        return self.surface.blit(source, dest, area, special_flags)
+
+    def blits(self, blit_sequence, doreturn=True):
+        blit_sequence = list(blit_sequence)
+        for blit_args in blit_sequence:
+            self.registry.check_blit(blit_args[0])
+        return self.surface.blits(blit_sequence, doreturn)
+
+    def __getattr__(self, name):
+        return getattr(self.surface, name)
+
+
+class SystemScheduler:
+    """
+    Class for running the systems of a frame (input, spawning, simulation, ..., drawing) in order and timing them.
+
+    A system is a function without arguments. If it returns False, the frame ends right away (e.g. after a collision).
+    Systems can be reordered or disabled from the config, e.g. for profiling experiments.
+    Concurrent systems are started on a worker thread at the beginning of the frame. When their turn in the order comes,
+    the scheduler waits for them - so they run concurrently with all systems before them and must not depend on them.
+
+    Args:
+        systems (dict): Maps the names of the systems to their functions.
+        order (list): Names of the systems in the order they run.
+        disabled (list): Names of the systems, that are skipped.
+        concurrent (list): Names of the systems, that run on a worker thread.
+        report_interval (int): Prints the average time of each system every report_interval frames (0: never).
+
+    Attributes:
+        stages (list): (name, function, concurrent) of all enabled systems in the order they run.
+        times (dict): Total time of each system since the last report (milliseconds).
+        frames (int): Number of frames since the last report.
+
+    Methods:
+        run(): Runs all systems of a frame. Returns False, if a system ended the frame.
+        get_report(): Returns the average time of each system per frame.
+    """
+    def __init__(self, systems, order, disabled=(), concurrent=(), report_interval=0):
+        unknown = [name for name in [*order, *disabled, *concurrent] if name not in systems]
+        if unknown:
+            raise ValueError(f"Unknown frame systems: {', '.join(unknown)}")
+
+        self.stages = [(name, systems[name], name in concurrent) for name in order if name not in disabled]
+        self.report_interval = report_interval
+        self.times = {name: 0.0 for name, _, _ in self.stages}
+        self.frames = 0
+
+        concurrent_stages = sum(1 for _, _, is_concurrent in self.stages if is_concurrent)
+        self.executor = ThreadPoolExecutor(max_workers=concurrent_stages, thread_name_prefix="system") if concurrent_stages else None
+
+    def run(self):
+        self.frames += 1
+
+        # Concurrent systems start right away
+        futures = {
+            name: self.executor.submit(self.run_timed, name, function)
+            for name, function, is_concurrent in self.stages if is_concurrent
+        }
+        try:
+            for name, function, is_concurrent in self.stages:
+                result = futures.pop(name).result() if is_concurrent else self.run_timed(name, function)
+                if result is False:
+                    return False
+        finally:
+            # When the frame ended early, the concurrent systems still have to finish before the next frame starts
+            for future in futures.values():
+                future.result()
+
+        if self.report_interval and self.frames >= self.report_interval:
+            print(self.get_report())
+            self.times = dict.fromkeys(self.times, 0.0)
+            self.frames = 0
+        return True
+
+    def run_timed(self, name, function):
+        start = time.perf_counter()
+        result = function()
+        self.times[name] += (time.perf_counter() - start) * 1000
+        return result
+
+    def get_report(self):
+        total = sum(self.times.values()) / max(1, self.frames)
+        systems = ", ".join(f"{name} {time_ms / max(1, self.frames):.2f}" for name, time_ms in self.times.items())
+        return f"Frame systems (ms per frame, {self.frames} frames, {total:.2f} total): {systems}"
+
+
+class SparseCanopy:
+    """
+    Class for a tree canopy layer, split into tiles.
+
+    Most of a cut out tree image is fully transparent, but blitting it still blends every single pixel.
+    We split the image into a grid of tiles once and only keep the tiles containing tree tops,
+    each cropped to the bounding rect of its visible pixels.
+    Tiles without any transparent pixels are stored without alpha, so they can use the fast opaque blit.
+    When drawing, only the tiles in the visible columns are blitted.
+
+    Args:
+        surface (pygame.Surface): The cut out tree image (with per pixel alpha).
+        tile_size (int): Width and height of the tiles (pixels).
+
+    Attributes:
+        tile_size (int): Width and height of the tiles (pixels).
+        columns (list): One list of (surface, (x, y)) tiles for each column of the grid. The position is relative to the layer.
+
+    Methods:
+        draw(screen, pos, opaque_only, columns): Draws the visible tiles of the layer, with its top left corner at pos
+            (only the tiles without transparent pixels, if opaque_only is True, and only the columns first to stop - 1, if columns is set).
+        convert(), convert_alpha(): Return a copy with the tiles converted to the display format (used by the AssetRegistry).
+        scaled(factor): Returns a copy with the tiles (and their positions) scaled up by factor.
+    """
+    def __init__(self, surface, tile_size, columns=None):
+        self.tile_size = tile_size
+        self.columns = columns if columns is not None else self.split_into_tiles(surface, tile_size)
+        # Opaque tiles only (reduced quality)
+        self.opaque_columns = [
+            [(tile, tile_pos) for tile, tile_pos in column if not tile.get_flags() & pygame.SRCALPHA] for column in self.columns
+        ]
+
+    @staticmethod
+    def split_into_tiles(surface, tile_size):
+        width, height = surface.get_size()
+        columns = []
+
+        for tile_x in range(0, width, tile_size):
+            column = []
+            for tile_y in range(0, height, tile_size):
+                tile = surface.subsurface(pygame.Rect(tile_x, tile_y, tile_size, tile_size).clip(surface.get_rect()))
+
+                # Skipping tiles without visible pixels
+                bounding_rect = tile.get_bounding_rect(min_alpha=1)
+                if bounding_rect.width == 0 or bounding_rect.height == 0:
+                    continue
+                tile = tile.subsurface(bounding_rect)
+
+                # A tile is opaque, if every pixel has an alpha value of 255
+                if pygame.mask.from_surface(tile, 254).count() == bounding_rect.width * bounding_rect.height:
+                    tile = tile.convert()
+                else:
+                    tile = tile.copy()
+                column.append((tile, (tile_x + bounding_rect.x, tile_y + bounding_rect.y)))
+            columns.append(column)
+
+        return columns
+
+    def draw(self, screen, pos, opaque_only=False, columns=None):
+        x, y = pos
+        first, stop = columns if columns is not None else (0, len(self.columns))
+        columns = self.opaque_columns if opaque_only else self.columns
+        # Visible columns of the layer
+        first_column = max(first, -x // self.tile_size)
+        last_column = min(stop, len(columns)) - 1
+        last_column = min(last_column, (screen.get_width() - x - 1) // self.tile_size)
+
+        screen.blits(
+            [
+                (tile, (x + tile_x, y + tile_y))
+                for column in columns[first_column:last_column + 1]
+                for tile, (tile_x, tile_y) in column
+            ],
+            doreturn=False
+        )
+
+    def converted(self):
+        columns = [
+            [(tile.convert_alpha() if tile.get_flags() & pygame.SRCALPHA else tile.convert(), tile_pos) for tile, tile_pos in column]
+            for column in self.columns
+        ]
+        return SparseCanopy(None, self.tile_size, columns)
+
+    def scaled(self, factor):
+        columns = [
+            [
+                (pygame.transform.scale(tile, (tile.get_width() * factor, tile.get_height() * factor)), (tile_x * factor, tile_y * factor))
+                for tile, (tile_x, tile_y) in column
+            ]
+            for column in self.columns
+        ]
+        return SparseCanopy(None, self.tile_size * factor, columns)
+
+    # Same interface as pygame.Surface, so the AssetRegistry can convert canopy layers like surfaces
+    convert = converted
+    convert_alpha = converted
+
+# Opening the asset archive (if there is one) - resource_path() resolves resources through it
+asset_archive = AssetArchive.open_if_exists(os.path.join(get_base_path(), ASSET_ARCHIVE_FILE))
+
 """Here we are running the instantiated game object"""
-game = Game()
-game.load_bike_sound() # load spawn bike sound
-game.load_pedestrian_sound() # loads walking sound for pedestrians
-game.load_canister_sound() # loads canister sound for pedestrians
-game.run()
+if __name__ == "__main__":
+    game = Game()
+    game.run()
 
 
 
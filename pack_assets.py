@@ -0,0 +1,38 @@
+"""
+Packs all game assets into a single archive (assets.pak), which main.py memory-maps on launch (see archive.py).
+
+Run this before building the release version (PyInstaller) and add assets.pak to the build,
+instead of the asset folders. Without an archive, the game loads the loose files (development).
+
+Usage:
+    python pack_assets.py [archive path]
+"""
+
+import os
+import sys
+
+from archive import ASSET_ARCHIVE_FILE, AssetArchive
+
+# Folders and files, that are packed - only files with these extensions (no .psd files)
+ASSET_FOLDERS = ["backgrounds", "trees", "enemies", "items", "sounds", "fonts"]
+ASSET_FILES = ["car2.png", "start_screen3.png", "game_over_screen_image.png", "explosion.gif"]
+ASSET_EXTENSIONS = tuple(AssetArchive.FILE_TYPES)
+
+
+def collect_assets(base_path):
+    relative_paths = list(ASSET_FILES)
+    for folder in ASSET_FOLDERS:
+        for directory, _, file_names in os.walk(os.path.join(base_path, folder)):
+            for file_name in sorted(file_names):
+                if file_name.lower().endswith(ASSET_EXTENSIONS):
+                    relative_paths.append(os.path.relpath(os.path.join(directory, file_name), base_path))
+    return relative_paths
+
+
+if __name__ == "__main__":
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    archive_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(base_path, ASSET_ARCHIVE_FILE)
+
+    relative_paths = collect_assets(base_path)
+    AssetArchive.write(archive_path, base_path, relative_paths)
+    print(f"Packed {len(relative_paths)} assets into {archive_path} ({os.path.getsize(archive_path) / 1e6:.1f} MB)")
@@ -0,0 +1,209 @@
+"""
+Soak test - plays the game automatically for hours of simulated time and fails, if memory, game objects or frame time keep growing.
+
+The game runs with the dummy video and audio drivers and a simulated clock: every frame advances the game time
+by the frame duration without waiting, so the game runs as fast as it can draw. It is drawn at a reduced
+render resolution (Game.RENDER_SCALE), which makes drawing faster. A bot steers the player car randomly.
+After a game over, the next run is started right away (like clicking CONTINUE).
+
+Every simulated minute a sample is taken: resident memory (RSS), memory traced by tracemalloc, the maximum number
+of live game objects and the average (real) frame time. The first samples are skipped (warm up).
+The test fails, if the last quarter of the samples is clearly higher than the first quarter for any of them.
+The allocation sites that grew the most are printed at the end.
+
+Usage:
+    python soak_test.py [--hours 1] [--frame-ms 8.33] [--render-scale 0.25] [--seed 0]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from main import Game
+
+SAMPLE_INTERVAL_MS = 60000
+WARM_UP_SAMPLES = 5
+
+# A metric keeps growing, if the median of the last quarter of the samples exceeds the median of the first quarter
+# by more than the absolute and the relative limit
+GROWTH_LIMITS = {
+    "rss_mb": (20, 0.10),
+    "traced_mb": (5, 0.10),
+    "objects": (10, 0.50),
+    "frame_ms": (1.0, 0.25),
+}
+
+STEERING_KEYS = [(), (pygame.K_UP,), (pygame.K_DOWN,), (pygame.K_LEFT,), (pygame.K_RIGHT,), (pygame.K_UP, pygame.K_RIGHT), (pygame.K_DOWN, pygame.K_RIGHT)]
+
+
+class SimulatedClock:
+    """
+    Replaces pygame.time.get_ticks() and the game's pygame.time.Clock - time only passes, when advance() is called.
+    """
+    def __init__(self, frame_ms):
+        self.frame_ms = frame_ms
+        self.time = 0.0
+        self.last_tick = time.perf_counter()
+        self.rawtime = 0
+
+    def get_ticks(self):
+        return int(self.time)
+
+    def tick(self, framerate=0):
+        # The real time the frame took (used by the quality governor)
+        now = time.perf_counter()
+        self.rawtime = int((now - self.last_tick) * 1000)
+        self.last_tick = now
+        return int(self.frame_ms)
+
+    def get_rawtime(self):
+        return self.rawtime
+
+    def advance(self):
+        self.time += self.frame_ms
+
+
+class SteeringBot:
+    """
+    Holds random arrow keys for random durations (like a player, who doesn't look at the screen).
+    """
+    def __init__(self, keyboard, clock):
+        self.keyboard = keyboard
+        self.clock = clock
+        self.next_change = 0
+
+    def update(self):
+        if self.clock.get_ticks() < self.next_change:
+            return
+        self.keyboard.held = set(random.choice(STEERING_KEYS))
+        self.next_change = self.clock.get_ticks() + random.randint(200, 1500)
+
+
+def get_rss_mb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        # No /proc (e.g. Windows, macOS) - the peak RSS is the closest we get
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def count_objects(game):
+    return (
+        len(game.enemies) + len(game.bikes) + len(game.pedestrians) + len(game.canisters)
+        + int(game.particles.alive.sum())
+    )
+
+
+def start_run(game):
+    # What the transition from the start or game over screen does
+    for _ in game.prefetch_main_game():
+        pass
+    game.change_to_main_game()
+
+
+def is_growing(name, values):
+    absolute_limit, relative_limit = GROWTH_LIMITS[name]
+    quarter = max(1, len(values) // 4)
+    first = statistics.median(values[:quarter])
+    last = statistics.median(values[-quarter:])
+    return last - first > max(absolute_limit, relative_limit * first), first, last
+
+
+def soak(hours, frame_ms, render_scale, seed):
+    random.seed(seed)
+    clock = SimulatedClock(frame_ms)
+    pygame.time.get_ticks = clock.get_ticks
+
+    # High scores and ghosts of the soak test don't end up in the player's leaderboard
+    Game.HIGH_SCORE_DIR = tempfile.mkdtemp(prefix="highway_frenzy_soak_")
+    Game.RENDER_SCALE = render_scale
+    game = Game()
+    game.clock = clock
+    game.asset_streamer.wait()
+    bot = SteeringBot(game.keyboard, clock)
+
+    tracemalloc.start()
+    samples = {name: [] for name in GROWTH_LIMITS}
+    baseline_snapshot = None
+    runs = 1
+    frames = 0
+    max_objects = 0
+    window_start = time.perf_counter()
+    next_sample = SAMPLE_INTERVAL_MS
+    end_time = hours * 3600000
+
+    start_run(game)
+    game.initialize_behaviour()
+    print(" minute |  RSS MB | traced MB | objects | frame ms | runs")
+
+    while clock.time < end_time:
+        bot.update()
+        running = game.main_game_frame()
+        clock.advance()
+        frames += 1
+        max_objects = max(max_objects, count_objects(game))
+
+        # Collision or game over - the main game loop is entered again (see Game.main_game())
+        if not running:
+            if game.state != game.main_game:
+                start_run(game)
+                runs += 1
+            game.initialize_behaviour()
+
+        if clock.time >= next_sample:
+            frame_time = (time.perf_counter() - window_start) * 1000 / frames
+            traced_mb = tracemalloc.get_traced_memory()[0] / 1e6
+            sample = {"rss_mb": get_rss_mb(), "traced_mb": traced_mb, "objects": max_objects, "frame_ms": frame_time}
+            print(f"{next_sample // 60000:7} | {sample['rss_mb']:7.1f} | {traced_mb:9.2f} | {max_objects:7} | {frame_time:8.2f} | {runs:4}")
+
+            if next_sample // SAMPLE_INTERVAL_MS > WARM_UP_SAMPLES:
+                for name, value in sample.items():
+                    samples[name].append(value)
+            elif next_sample // SAMPLE_INTERVAL_MS == WARM_UP_SAMPLES:
+                baseline_snapshot = tracemalloc.take_snapshot()
+
+            next_sample += SAMPLE_INTERVAL_MS
+            frames = 0
+            max_objects = 0
+            window_start = time.perf_counter()
+
+    if baseline_snapshot is not None:
+        print("\nLargest allocation growth since the warm up:")
+        for statistic in tracemalloc.take_snapshot().compare_to(baseline_snapshot, "lineno")[:10]:
+            print(f"  {statistic}")
+
+    if len(samples["rss_mb"]) < 4:
+        print("\nToo few samples to check for growth - run for longer")
+        return True
+
+    print()
+    passed = True
+    for name, values in samples.items():
+        growing, first, last = is_growing(name, values)
+        print(f"{'GROWING' if growing else 'ok':7} {name}: {first:.2f} -> {last:.2f}")
+        passed = passed and not growing
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays the game automatically and checks for leaks and slowdowns.")
+    parser.add_argument("--hours", type=float, default=1.0, help="simulated play time")
+    parser.add_argument("--frame-ms", type=float, default=1000 / 120, help="simulated duration of a frame")
+    parser.add_argument("--render-scale", type=float, default=0.25, help="render resolution relative to the screen")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    if not soak(arguments.hours, arguments.frame_ms, arguments.render_scale, arguments.seed):
+        sys.exit(1)
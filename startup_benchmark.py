@@ -0,0 +1,247 @@
+"""
+Startup benchmark - measures the time to the first start screen frame and to the first gameplay frame
+and fails, if one of them exceeds its budget.
+
+Every run starts the game in a new process (dummy video and audio drivers). The time is broken down into
+interpreter start, importing numpy and pygame, pygame init, the first set_mode, loading fonts, decoding images,
+transforming images (scale, rotate), decoding sounds and everything else (game code, convert(), ...).
+Images and sounds, that are streamed in on the start screen, are decoded on a background thread -
+that time is listed separately, as it overlaps with the main thread.
+START is clicked as soon as all gameplay resources are loaded, and the fade to the main game is skipped,
+so the time to the first gameplay frame is the loading time the player would notice.
+
+There are two variants:
+    cold: the asset files are dropped from the OS page cache before every run (posix_fadvise, Linux only),
+          like the first launch after a reboot. Python and the libraries themselves stay cached.
+    warm: the asset files were read by the run before.
+
+Usage:
+    python startup_benchmark.py [--runs 3] [--variants cold warm] [--start-screen-budget-ms ...] [--gameplay-budget-ms ...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Budgets for the median of the runs (milliseconds since the process was started)
+BUDGETS_MS = {
+    "cold": {"start_screen": 2500, "gameplay": 6000},
+    "warm": {"start_screen": 1500, "gameplay": 4000},
+}
+
+# Files, that are dropped from the page cache for cold runs
+ASSET_EXTENSIONS = (".png", ".gif", ".jpg", ".wav", ".mp3", ".ogg", ".ttf", ".pak")
+
+# Phases in the order they are listed
+PHASES = [
+    "interpreter", "import numpy + pygame", "pygame init", "first set_mode", "set_mode", "fonts",
+    "image decode", "image transform", "sound decode", "other",
+    "image decode (background)", "image transform (background)", "sound decode (background)",
+]
+
+
+class StartupProfile:
+    """
+    Adds up the time spent in the timed pygame functions by phase.
+
+    Functions called on a background thread are added to the phase "<phase> (background)".
+    Nested calls (e.g. pygame.init() initializing the mixer) are only counted once, in the outer phase.
+    """
+    def __init__(self):
+        self.phases = {}
+        self.depth = 0
+
+    def timed(self, phase, function):
+        def timed_function(*args, **kwargs):
+            background = threading.current_thread() is not threading.main_thread()
+            if not background:
+                if self.depth:
+                    return function(*args, **kwargs)
+                self.depth += 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                name = f"{phase} (background)" if background else phase
+                self.add(name, (time.perf_counter() - start) * 1000)
+                if not background:
+                    self.depth -= 1
+        return timed_function
+
+    def add(self, phase, time_ms):
+        self.phases[phase] = self.phases.get(phase, 0) + time_ms
+
+    def snapshot(self, total_ms):
+        # Everything, that was not measured on the main thread, is game code (or not timed, like convert())
+        phases = dict(self.phases)
+        measured = sum(time_ms for phase, time_ms in phases.items() if not phase.endswith("(background)"))
+        phases["other"] = total_ms - measured
+        phases["total"] = total_ms
+        return phases
+
+
+class FirstGameplayFrame(Exception):
+    pass
+
+
+def run_child(spawn_time):
+    """
+    Starts the game in this process and prints the phases until the first start screen and gameplay frame (json).
+    """
+    start = time.perf_counter()
+    profile = StartupProfile()
+    profile.add("interpreter", (time.time() - spawn_time) * 1000)
+
+    def elapsed_ms():
+        return profile.phases["interpreter"] + (time.perf_counter() - start) * 1000
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import_start = time.perf_counter()
+    import numpy  # noqa: F401
+    import pygame
+    profile.add("import numpy + pygame", (time.perf_counter() - import_start) * 1000)
+
+    # main.py initializes pygame on import - the functions have to be timed before
+    pygame.init = profile.timed("pygame init", pygame.init)
+    pygame.font.init = profile.timed("pygame init", pygame.font.init)
+    pygame.mixer.init = profile.timed("pygame init", pygame.mixer.init)
+    pygame.font.Font = profile.timed("fonts", pygame.font.Font)
+    pygame.image.load = profile.timed("image decode", pygame.image.load)
+    pygame.mixer.Sound = profile.timed("sound decode", pygame.mixer.Sound)
+    for name in ("scale", "smoothscale", "rotate", "flip"):
+        setattr(pygame.transform, name, profile.timed("image transform", getattr(pygame.transform, name)))
+    set_mode = pygame.display.set_mode
+    first_set_mode = profile.timed("first set_mode", set_mode)
+    later_set_mode = profile.timed("set_mode", set_mode)
+    pygame.display.set_mode = lambda *args, **kwargs: (
+        later_set_mode if "first set_mode" in profile.phases else first_set_mode
+    )(*args, **kwargs)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main
+
+    # High scores and ghosts of the benchmark don't end up in the player's leaderboard
+    main.Game.HIGH_SCORE_DIR = tempfile.mkdtemp(prefix="highway_frenzy_startup_")
+    results = {}
+    game = None
+
+    # Clicking START as soon as possible - without the fade (the prefetch still runs)
+    update = pygame.display.update
+
+    def update_start_screen(*args):
+        update(*args)
+        if "start_screen" not in results:
+            results["start_screen"] = profile.snapshot(elapsed_ms())
+        if game is not None and game.state == game.start_screen and game.transition is None and game.asset_streamer.is_done():
+            game.begin_transition(game.change_to_main_game, duration=1, prefetch=game.prefetch_main_game())
+    pygame.display.update = update_start_screen
+
+    present = main.Game.present
+
+    def present_first_frame(self):
+        present(self)
+        results["gameplay"] = profile.snapshot(elapsed_ms())
+        raise FirstGameplayFrame()
+    main.Game.present = present_first_frame
+
+    game = main.Game()
+    try:
+        game.run()
+    except FirstGameplayFrame:
+        pass
+
+    print(json.dumps(results))
+
+
+def drop_from_page_cache(base_path):
+    """
+    Asks the OS to drop the asset files from the page cache. Returns False, if that is not supported.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for directory, directories, file_names in os.walk(base_path):
+        directories[:] = [name for name in directories if not name.startswith(".")]
+        for file_name in file_names:
+            if file_name.lower().endswith(ASSET_EXTENSIONS):
+                with open(os.path.join(directory, file_name), "rb") as file:
+                    os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return True
+
+
+def run_once(base_path, cold):
+    if cold:
+        drop_from_page_cache(base_path)
+    child = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", repr(time.time())],
+        cwd=base_path, capture_output=True, text=True,
+    )
+    if child.returncode != 0:
+        print(child.stderr)
+        raise RuntimeError(f"The game failed to start (exit code {child.returncode})")
+    # The game prints while starting - the results are the last line
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def benchmark(runs, variants, budgets):
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    if "cold" in variants and not hasattr(os, "posix_fadvise"):
+        print("Dropping files from the page cache is not supported on this platform - the cold runs are warm")
+
+    medians = {}
+    for variant in variants:
+        if variant == "warm":
+            # The files are read once, before the measured runs
+            run_once(base_path, cold=False)
+        results = [run_once(base_path, cold=variant == "cold") for _ in range(runs)]
+        medians[variant] = {
+            frame: {phase: statistics.median(result[frame].get(phase, 0) for result in results) for phase in [*PHASES, "total"]}
+            for frame in ("start_screen", "gameplay")
+        }
+
+    passed = True
+    for frame, title in (("start_screen", "first start screen frame"), ("gameplay", "first gameplay frame")):
+        print(f"\nUntil the {title} (median of {runs} runs, ms)")
+        print(f"{'':30}" + "".join(f"{variant:>10}" for variant in variants))
+        for phase in [*PHASES, "total"]:
+            values = [medians[variant][frame][phase] for variant in variants]
+            if phase != "total" and not any(values):
+                continue
+            print(f"{phase:30}" + "".join(f"{value:10.1f}" for value in values))
+
+        for variant in variants:
+            budget = budgets[variant][frame]
+            total = medians[variant][frame]["total"]
+            exceeded = total > budget
+            print(f"{'OVER BUDGET' if exceeded else 'ok':11} {variant}: {total:.0f} ms (budget {budget} ms)")
+            passed = passed and not exceeded
+    return passed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        run_child(float(sys.argv[2]))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Measures the startup time of the game and checks it against a budget.")
+    parser.add_argument("--runs", type=int, default=3, help="runs per variant (the median is used)")
+    parser.add_argument("--variants", nargs="+", choices=list(BUDGETS_MS), default=list(BUDGETS_MS))
+    parser.add_argument("--start-screen-budget-ms", type=float, help="budget of the first start screen frame (all variants)")
+    parser.add_argument("--gameplay-budget-ms", type=float, help="budget of the first gameplay frame (all variants)")
+    arguments = parser.parse_args()
+
+    budgets = {variant: dict(budget) for variant, budget in BUDGETS_MS.items()}
+    for variant in budgets:
+        if arguments.start_screen_budget_ms is not None:
+            budgets[variant]["start_screen"] = arguments.start_screen_budget_ms
+        if arguments.gameplay_budget_ms is not None:
+            budgets[variant]["gameplay"] = arguments.gameplay_budget_ms
+
+    if not benchmark(arguments.runs, arguments.variants, budgets):
+        sys.exit(1)